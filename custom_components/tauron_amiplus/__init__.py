@@ -8,15 +8,21 @@ from homeassistant.components.sensor import PLATFORM_SCHEMA
 from homeassistant.config_entries import SOURCE_IMPORT
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
 from homeassistant.util.dt import DATE_STR_FORMAT, parse_date
 
 from .const import (
+    BACKFILL_STORAGE_KEY_PREFIX, BACKFILL_STORAGE_VERSION, CACHE_STORAGE_KEY_PREFIX, CACHE_STORAGE_VERSION,
     CONF_METER_ID, CONF_METER_NAME, CONF_SHOW_12_MONTHS, CONF_SHOW_BALANCED, CONF_SHOW_BALANCED_YEAR,
     CONF_SHOW_CONFIGURABLE, CONF_SHOW_CONFIGURABLE_DATE, CONF_SHOW_GENERATION, CONF_STORE_STATISTICS, CONF_TARIFF,
-    DOMAIN, PLATFORMS,
+    CONST_URL_SERVICE, CONST_URL_SERVICE_MOJ_TAURON, DOMAIN, PLATFORMS, SCHEDULER_STORAGE_KEY_PREFIX,
+    SCHEDULER_STORAGE_VERSION, STORAGE_KEY_PREFIX, STORAGE_VERSION, WATERMARKS_STORAGE_KEY_PREFIX,
+    WATERMARKS_STORAGE_VERSION,
 )
-from .coordinator import TauronAmiplusUpdateCoordinator
+from .coordinator import TauronAmiplusUpdateCoordinator, async_release_account_coordinator, get_account_coordinator
 from .services import DownloadStatisticsService
+from .session import get_account_session
 from .typing_helpers import TauronAmiplusRuntimeData, TauronAmiplusConfigEntry
 
 _LOGGER = logging.getLogger(__name__)
@@ -85,21 +91,54 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: TauronAmiplusConf
         show_configurable_date=show_configurable_date,
         store_statistics=store_statistics,
     )
+    account_coordinator = get_account_coordinator(hass, get_account_session(hass, user, password))
+    account_coordinator.register(config_entry.entry_id, tauron_amiplus_update_coordinator)
     config_entry.runtime_data = TauronAmiplusRuntimeData(tauron_amiplus_update_coordinator)
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
     config_entry.async_on_unload(config_entry.add_update_listener(async_reload_entry))
     service = DownloadStatisticsService(hass)
     hass.services.async_register(service.domain, service.service, service.async_handle_service, service.schema)
-    await tauron_amiplus_update_coordinator.async_request_refresh()
+    await account_coordinator.async_request_refresh()
+    await tauron_amiplus_update_coordinator.backfill.async_resume(
+        tauron_amiplus_update_coordinator.create_statistics_updater())
     return True
 
 
 async def async_unload_entry(hass, config_entry) -> bool:
     """Unload a config entry."""
     await hass.config_entries.async_unload_platforms(config_entry, PLATFORMS)
+    await config_entry.runtime_data.coordinator.statistics_stage.async_stop()
+    await config_entry.runtime_data.coordinator.backfill.async_stop()
+    await async_release_account_coordinator(hass, config_entry.data[CONF_USERNAME], config_entry.entry_id)
     return True
 
 
+async def async_remove_entry(hass, config_entry) -> None:
+    """Remove data stored for a config entry, shared meter and account data is kept while other entries use it."""
+    username = config_entry.data[CONF_USERNAME]
+    meter_id = config_entry.data[CONF_METER_ID]
+    other_entries = [e for e in hass.config_entries.async_entries(DOMAIN) if e.entry_id != config_entry.entry_id]
+    stores = [(BACKFILL_STORAGE_VERSION, f"{BACKFILL_STORAGE_KEY_PREFIX}_{config_entry.entry_id}")]
+    if not any(e.data[CONF_METER_ID] == meter_id for e in other_entries):
+        stores.append((CACHE_STORAGE_VERSION, f"{CACHE_STORAGE_KEY_PREFIX}_{slugify(meter_id)}"))
+        stores.append((WATERMARKS_STORAGE_VERSION, f"{WATERMARKS_STORAGE_KEY_PREFIX}_{meter_id}"))
+    if not any(e.data[CONF_USERNAME] == username for e in other_entries):
+        stores.append((SCHEDULER_STORAGE_VERSION, f"{SCHEDULER_STORAGE_KEY_PREFIX}_{slugify(username)}"))
+        stores.extend(session_stores(slugify(username)))
+    await async_remove_stores(hass, stores)
+
+
+def session_stores(owner: str) -> list[tuple[int, str]]:
+    return [(STORAGE_VERSION, f"{STORAGE_KEY_PREFIX}_{owner}_{slugify(service)}")
+            for service in [CONST_URL_SERVICE, CONST_URL_SERVICE_MOJ_TAURON]]
+
+
+async def async_remove_stores(hass: HomeAssistant, stores: list[tuple[int, str]]):
+    for version, key in stores:
+        _LOGGER.debug("Removing stored data: %s", key)
+        await Store(hass, version, key).async_remove()
+
+
 async def async_reload_entry(hass, entry) -> None:
     """Reload config entry."""
     await async_unload_entry(hass, entry)
@@ -147,5 +186,10 @@ async def async_migrate_entry(hass, config_entry: TauronAmiplusConfigEntry) -> b
         config_entry.version = 3
         hass.config_entries.async_update_entry(config_entry, data=data, options=options)
 
+    if config_entry.version == 3:
+        # Session cookies are stored per account instead of per config entry
+        await async_remove_stores(hass, session_stores(config_entry.entry_id))
+        hass.config_entries.async_update_entry(config_entry, version=4)
+
     _LOGGER.info("Migration to version %s successful", config_entry.version)
     return True
@@ -0,0 +1,78 @@
+"""Aggregated values of TAURON data sets."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from .balance import calculate_balance
+from .series import HourlySeries
+
+
+@dataclass
+class TauronAmiplusSummary:
+    total: float
+    zones: dict[str, float]
+    data_range: str | None
+
+
+@dataclass
+class TauronAmiplusBalanceSummary:
+    balance: float
+    sum_consumption: float
+    sum_generation: float
+    zones: dict[str, float]
+    data_range: str | None
+
+
+def summarize_json(json_data: dict) -> TauronAmiplusSummary:
+    total = round(json_data["data"]["sum"], 3)
+    zones = {}
+    data_range = None
+    if (
+        "zones" in json_data["data"]
+        and len(json_data["data"]["zones"]) > 0
+        and "zonesName" in json_data["data"]
+        and len(json_data["data"]["zonesName"]) > 0
+    ):
+        zones = {v: round(json_data["data"]["zones"].get(k, 0), 3) for (k, v) in json_data["data"]["zonesName"].items()}
+    if (
+        "allData" in json_data["data"]
+        and len(json_data["data"]["allData"]) > 0
+        and "Date" in json_data["data"]["allData"][0]
+    ):
+        consumption_data = json_data["data"]["allData"]
+        data_range = f"{consumption_data[0]['Date']} - {consumption_data[-1]['Date']}"
+    return TauronAmiplusSummary(total, zones, data_range)
+
+
+def summarize_series(series: HourlySeries) -> TauronAmiplusSummary:
+    total = round(series.total, 3)
+    zones = {}
+    if len(series.zone_totals) > 0 and len(series.zone_names) > 0:
+        zones = {v: round(series.zone_totals.get(k, 0), 3) for (k, v) in series.zone_names.items()}
+    return TauronAmiplusSummary(total, zones, series.data_range)
+
+
+def summarize_balance(consumption_series: HourlySeries,
+                      generation_series: HourlySeries) -> TauronAmiplusBalanceSummary:
+    zone_names = consumption_series.zone_names
+    if len(consumption_series) == 0 or len(generation_series) == 0:
+        return TauronAmiplusBalanceSummary(0, 0, 0, {}, "")
+    result = calculate_balance(consumption_series, generation_series)
+
+    zones = {}
+    for zone, value in result.zones_consumption.items():
+        zone_key = f"{zone_names[zone]}_consumption"
+        zones[zone_key] = zones.get(zone_key, 0) + value
+    for zone, value in result.zones_generation.items():
+        zone_key = f"{zone_names[zone]}_generation"
+        zones[zone_key] = zones.get(zone_key, 0) - value
+
+    sum_consumption = result.sum_consumption
+    sum_generation = -result.sum_generation
+    return TauronAmiplusBalanceSummary(
+        balance=round(sum_consumption + sum_generation, 3),
+        sum_consumption=round(sum_consumption, 3),
+        sum_generation=round(sum_generation, 3),
+        zones={k: round(v, 3) for (k, v) in zones.items()},
+        data_range=consumption_series.data_range,
+    )
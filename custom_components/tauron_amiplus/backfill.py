@@ -0,0 +1,146 @@
+"""Resumable download of historical statistics."""
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.storage import Store
+
+from .const import (BACKFILL_MAX_RETRIES, BACKFILL_RETRY_DELAY, BACKFILL_STORAGE_KEY_PREFIX,
+                    BACKFILL_STORAGE_VERSION, EVENT_BACKFILL_PROGRESS)
+
+if TYPE_CHECKING:
+    from .statistics import TauronAmiplusStatisticsUpdater
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TauronAmiplusBackfill:
+    """Downloads statistics from a start date month by month, checkpointing progress so it survives restarts."""
+
+    def __init__(self, hass: HomeAssistant, config_entry_id: str, meter_id: str, statistics_lock: asyncio.Lock):
+        self._hass = hass
+        self._statistics_lock = statistics_lock
+        self._config_entry_id = config_entry_id
+        self._meter_id = meter_id
+        self._store = Store(hass, BACKFILL_STORAGE_VERSION, f"{BACKFILL_STORAGE_KEY_PREFIX}_{config_entry_id}")
+        self._task: asyncio.Task | None = None
+        self._checkpoint: dict | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def async_start(self, start_date: datetime.date, updater: TauronAmiplusStatisticsUpdater):
+        await self.async_stop()
+        self._checkpoint = {
+            "start_date": start_date.isoformat(),
+            "next_date": start_date.isoformat(),
+            "reset": True,
+        }
+        await self._store.async_save(self._checkpoint)
+        self.log(f"Starting statistics backfill from {start_date}")
+        self._launch(updater)
+
+    async def async_resume(self, updater: TauronAmiplusStatisticsUpdater):
+        if self.running:
+            return
+        self._checkpoint = await self._store.async_load()
+        if self._checkpoint is None:
+            return
+        self.log(f"Resuming statistics backfill from {self._checkpoint['next_date']}")
+        self._launch(updater)
+
+    async def async_stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def _launch(self, updater: TauronAmiplusStatisticsUpdater):
+        self._task = self._hass.async_create_background_task(
+            self._run(updater), f"tauron_amiplus_backfill_{self._meter_id}")
+
+    async def _run(self, updater: TauronAmiplusStatisticsUpdater):
+        checkpoint = self._checkpoint
+        start_date = datetime.date.fromisoformat(checkpoint["start_date"])
+        next_date = datetime.date.fromisoformat(checkpoint["next_date"])
+        run_start_date = next_date
+        run_started = time.monotonic()
+        retries = 0
+        while next_date <= datetime.date.today():
+            today = datetime.date.today()
+            chunk_end = min((next_date.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+                            - datetime.timedelta(days=1), today)
+            if chunk_end >= updater.settled_before():
+                # Watermarks stop at days eLicznik may still fill in, so the chunk reaching them is the last one,
+                # otherwise the next chunk would continue from sums lower than the rows already written
+                chunk_end = today
+            day_from = datetime.datetime.combine(next_date, datetime.time())
+            day_to = datetime.datetime.now() if chunk_end == today else datetime.datetime.combine(chunk_end,
+                                                                                                  datetime.time())
+            self.log(f"Downloading statistics for range: {next_date} - {chunk_end}")
+            try:
+                async with self._statistics_lock:
+                    imported = await updater.import_range(day_from, day_to, checkpoint["reset"])
+            except ConfigEntryAuthFailed as err:
+                # Checkpoint is kept, the backfill resumes when the entry is set up again after reauthentication
+                _LOGGER.error("Statistics backfill of meter %s stopped, invalid credentials", self._meter_id)
+                self._fire_progress(start_date, next_date, None, error=str(err), stopped=True)
+                return
+            except Exception as err:
+                if retries >= BACKFILL_MAX_RETRIES:
+                    _LOGGER.error("Statistics backfill of meter %s stopped after %s retries: %s",
+                                  self._meter_id, retries, err)
+                    self._fire_progress(start_date, next_date, None, error=str(err), stopped=True)
+                    await self._store.async_remove()
+                    self._checkpoint = None
+                    return
+                delay = BACKFILL_RETRY_DELAY * 2 ** retries
+                retries += 1
+                _LOGGER.error("Statistics backfill of meter %s failed, retrying in %s s: %s",
+                              self._meter_id, delay, err)
+                self._fire_progress(start_date, next_date, None, error=str(err))
+                await asyncio.sleep(delay)
+                continue
+            retries = 0
+            next_date = chunk_end + datetime.timedelta(days=1)
+            checkpoint["next_date"] = next_date.isoformat()
+            checkpoint["reset"] = checkpoint["reset"] and not imported
+            await self._store.async_save(checkpoint)
+            elapsed = time.monotonic() - run_started
+            done_days = (next_date - run_start_date).days
+            remaining_days = max((datetime.date.today() - next_date).days + 1, 0)
+            eta = datetime.datetime.now().astimezone() + datetime.timedelta(
+                seconds=elapsed / done_days * remaining_days)
+            self._fire_progress(start_date, next_date, eta)
+        await self._store.async_remove()
+        self._checkpoint = None
+        self.log("Statistics backfill finished")
+
+    def _fire_progress(self, start_date: datetime.date, next_date: datetime.date, eta: datetime.datetime | None,
+                       error: str | None = None, stopped: bool = False):
+        total_days = (datetime.date.today() - start_date).days + 1
+        done_days = min((next_date - start_date).days, total_days)
+        self._hass.bus.async_fire(EVENT_BACKFILL_PROGRESS, {
+            "config_entry_id": self._config_entry_id,
+            "meter_id": self._meter_id,
+            "start_date": start_date.isoformat(),
+            "next_date": next_date.isoformat(),
+            "progress": round(100 * done_days / total_days, 1),
+            "eta": eta.isoformat() if eta is not None else None,
+            "finished": done_days >= total_days,
+            "error": error,
+            "stopped": stopped,
+        })
+
+    def log(self, msg):
+        _LOGGER.debug(f"[{self._meter_id}]: {msg}")
@@ -0,0 +1,95 @@
+"""Balance calculation for TAURON hourly data."""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+
+from .series import HourlySeries
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@dataclass
+class BalanceResult:
+    consumption: array
+    generation: array
+    sum_consumption: float
+    sum_generation: float
+    zones_consumption: dict[str, float]
+    zones_generation: dict[str, float]
+
+
+def calculate_balance(consumption: HourlySeries, generation: HourlySeries) -> BalanceResult:
+    """Splits hourly consumption - generation into clipped consumption and generation parts with per-zone sums.
+
+    Generation values are returned as positive numbers. Zones are keyed with zone keys of the consumption series
+    and only contain zones that had at least one hour of the given kind.
+    """
+    length = min(len(consumption), len(generation))
+    if np is not None:
+        return _calculate_balance_numpy(consumption, generation, length)
+    return _calculate_balance_python(consumption, generation, length)
+
+
+def _calculate_balance_numpy(consumption: HourlySeries, generation: HourlySeries, length: int) -> BalanceResult:
+    balance = (np.frombuffer(consumption.values, dtype=np.float64, count=length)
+               - np.frombuffer(generation.values, dtype=np.float64, count=length))
+    zones = np.frombuffer(consumption.zones, dtype=np.uint8, count=length)
+    positive = balance > 0
+    balanced_consumption = np.where(positive, balance, 0.0)
+    balanced_generation = np.where(positive, 0.0, -balance)
+    zones_count = len(consumption.zone_keys)
+    consumption_hours = np.bincount(zones[positive], minlength=zones_count)
+    generation_hours = np.bincount(zones[~positive], minlength=zones_count)
+    consumption_sums = np.bincount(zones, weights=balanced_consumption, minlength=zones_count)
+    generation_sums = np.bincount(zones, weights=balanced_generation, minlength=zones_count)
+    return BalanceResult(
+        consumption=array("d", balanced_consumption.tobytes()),
+        generation=array("d", balanced_generation.tobytes()),
+        sum_consumption=float(balanced_consumption.sum()),
+        sum_generation=float(balanced_generation.sum()),
+        zones_consumption={
+            zone: float(consumption_sums[i]) for i, zone in enumerate(consumption.zone_keys) if consumption_hours[i] > 0
+        },
+        zones_generation={
+            zone: float(generation_sums[i]) for i, zone in enumerate(consumption.zone_keys) if generation_hours[i] > 0
+        },
+    )
+
+
+def _calculate_balance_python(consumption: HourlySeries, generation: HourlySeries, length: int) -> BalanceResult:
+    balanced_consumption = array("d", bytes(8 * length))
+    balanced_generation = array("d", bytes(8 * length))
+    consumption_sums = [0.0] * len(consumption.zone_keys)
+    generation_sums = [0.0] * len(consumption.zone_keys)
+    consumption_hours = [0] * len(consumption.zone_keys)
+    generation_hours = [0] * len(consumption.zone_keys)
+    consumption_values = consumption.values
+    generation_values = generation.values
+    zones = consumption.zones
+    for i in range(length):
+        balance = consumption_values[i] - generation_values[i]
+        zone = zones[i]
+        if balance > 0:
+            balanced_consumption[i] = balance
+            consumption_sums[zone] += balance
+            consumption_hours[zone] += 1
+        else:
+            balanced_generation[i] = -balance
+            generation_sums[zone] -= balance
+            generation_hours[zone] += 1
+    return BalanceResult(
+        consumption=balanced_consumption,
+        generation=balanced_generation,
+        sum_consumption=sum(consumption_sums),
+        sum_generation=sum(generation_sums),
+        zones_consumption={
+            zone: consumption_sums[i] for i, zone in enumerate(consumption.zone_keys) if consumption_hours[i] > 0
+        },
+        zones_generation={
+            zone: generation_sums[i] for i, zone in enumerate(consumption.zone_keys) if generation_hours[i] > 0
+        },
+    )
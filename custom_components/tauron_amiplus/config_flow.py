@@ -30,7 +30,7 @@ _LOGGER = logging.getLogger(__name__)
 class TauronAmiplusFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     """TAURON config flow."""
 
-    VERSION = 3
+    VERSION = 4
 
     def __init__(self):
         """Initialize TAURON configuration flow."""
@@ -1,36 +1,61 @@
 """Update coordinator for TAURON sensors."""
+import asyncio
 import datetime
+import json
 import logging
-import re
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Optional, Tuple
 
 from aiohttp import ClientSession
 # from bs4 import BeautifulSoup
 from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryAuthFailed
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
 from homeassistant.helpers.storage import Store
 from homeassistant.util import slugify
 
+from .aggregates import (TauronAmiplusBalanceSummary, TauronAmiplusSummary, summarize_balance, summarize_json,
+                         summarize_series)
 from .const import (
+    CACHE_MAX_AGE_DAYS,
+    CACHE_SAVE_DELAY,
+    CACHE_STORAGE_KEY_PREFIX,
+    CACHE_STORAGE_VERSION,
+    CONST_CONSUMPTION,
     CONST_DATE_FORMAT,
+    CONST_GENERATION,
     CONST_MAX_LOOKUP_RANGE,
+    CONST_MIN_HOURS_IN_DAY,
+    CONST_RANGE_WINDOW_DAYS,
     CONST_REQUEST_HEADERS,
     CONST_URL_ENERGY,
     CONST_URL_ENERGY_BUSINESS,
-    CONST_URL_LOGIN,
     CONST_URL_LOGIN_MOJ_TAURON,
     CONST_URL_READINGS,
-    CONST_URL_SELECT_METER,
-    CONST_URL_SERVICE,
     CONST_URL_SERVICE_MOJ_TAURON,
-    STORAGE_VERSION,
-    STORAGE_KEY_PREFIX,
+    DEFAULT_MAX_CONCURRENT_REQUESTS,
+    DEFAULT_REQUEST_PACING,
 )
+from .executor import async_run_in_executor
+from .request_limiter import RequestLimiter
+from .series import HourlySeries, as_date
+from .session import TauronAmiplusAccountSession, get_account_session
+from .timeline import HourlyTimeline
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 _LOGGER = logging.getLogger(__name__)
 
+_TOO_MANY_LOGINS = "Przekroczono maksymalną liczbę logowań.".encode()
+
+
+def _json_loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 class TauronAmiplusRawData:
     def __init__(self):
@@ -38,59 +63,72 @@ class TauronAmiplusRawData:
         self.consumption: Optional[TauronAmiplusDataSet] = None
         self.generation: Optional[TauronAmiplusDataSet] = None
         self.payments: Optional[list[MojTauronPaymentData]] = None
+        self.fetched_days = 0
+        self._summaries: dict[tuple[bool, str], TauronAmiplusSummary | None] = {}
 
     def data_unavailable(self):
         return self.consumption is None or self.generation is None
 
-    @property
-    def balance_daily(self):
-        if self.data_unavailable() or self.consumption.json_daily is None or self.generation.json_daily is None:
-            return None
-        return self.consumption.json_daily, self.generation.json_daily
+    def get_summary(self, generation: bool, attribute: str) -> TauronAmiplusSummary | None:
+        key = (generation, attribute)
+        if key not in self._summaries:
+            dataset = self.generation if generation else self.consumption
+            value = getattr(dataset, attribute, None) if dataset is not None else None
+            if value is None:
+                summary = None
+            elif isinstance(value, HourlySeries):
+                summary = summarize_series(value)
+            else:
+                summary = summarize_json(value)
+            self._summaries[key] = summary
+        return self._summaries[key]
 
-    @property
-    def balance_monthly(self):
-        if (self.data_unavailable() or self.consumption.json_month_hourly is None or
-                self.generation.json_month_hourly is None):
+    def _get_balance(self, attribute: str) -> TauronAmiplusBalanceSummary | None:
+        if self.data_unavailable():
             return None
-        return self.consumption.json_month_hourly, self.generation.json_month_hourly
-
-    @property
-    def balance_yearly(self):
-        if (self.data_unavailable() or self.consumption.json_year_hourly is None or
-                self.generation.json_year_hourly is None):
+        consumption = getattr(self.consumption, attribute)
+        generation = getattr(self.generation, attribute)
+        if consumption is None or generation is None:
             return None
-        return self.consumption.json_year_hourly, self.generation.json_year_hourly
+        return summarize_balance(consumption, generation)
 
-    @property
-    def balance_last_12_months_hourly(self):
-        if (self.data_unavailable() or
-                self.consumption.json_last_12_months_hourly is None or
-                self.generation.json_last_12_months_hourly is None):
-            return None
-        return self.consumption.json_last_12_months_hourly, self.generation.json_last_12_months_hourly
+    @cached_property
+    def balance_daily(self) -> TauronAmiplusBalanceSummary | None:
+        return self._get_balance("daily")
 
-    @property
-    def balance_configurable_hourly(self):
-        if (self.data_unavailable() or
-                self.consumption.json_configurable_hourly is None or
-                self.generation.json_configurable_hourly is None):
-            return None
-        return self.consumption.json_configurable_hourly, self.generation.json_configurable_hourly
+    @cached_property
+    def balance_monthly(self) -> TauronAmiplusBalanceSummary | None:
+        return self._get_balance("month_hourly")
+
+    @cached_property
+    def balance_yearly(self) -> TauronAmiplusBalanceSummary | None:
+        return self._get_balance("year_hourly")
+
+    @cached_property
+    def balance_last_12_months_hourly(self) -> TauronAmiplusBalanceSummary | None:
+        return self._get_balance("last_12_months_hourly")
+
+    @cached_property
+    def balance_configurable_hourly(self) -> TauronAmiplusBalanceSummary | None:
+        return self._get_balance("configurable_hourly")
 
 
 class TauronAmiplusDataSet:
     def __init__(self):
         self.json_reading = None
-        self.json_daily = None
+        self.daily: Optional[HourlySeries] = None
         self.daily_date = None
-        self.json_monthly = None
-        self.json_yearly = None
-        self.json_month_hourly = None
-        self.json_year_hourly = None
-        self.json_last_30_days_hourly = None
-        self.json_last_12_months_hourly = None
-        self.json_configurable_hourly = None
+        self.monthly: Optional[HourlySeries | dict] = None
+        self.yearly: Optional[HourlySeries | dict] = None
+        self.month_hourly: Optional[HourlySeries] = None
+        self.year_hourly: Optional[HourlySeries] = None
+        self.last_30_days_hourly: Optional[HourlySeries] = None
+        self.last_12_months_hourly: Optional[HourlySeries] = None
+        self.configurable_hourly: Optional[HourlySeries] = None
+
+
+class SessionExpiredException(Exception):
+    pass
 
 
 @dataclass
@@ -114,6 +152,9 @@ class TauronAmiplusConnector:
         show_balanced_yearly: bool = False,
         show_configurable: bool = False,
         show_configurable_date: datetime.date = None,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+        request_pacing: float = DEFAULT_REQUEST_PACING,
+        account_session: TauronAmiplusAccountSession | None = None,
     ):
         self._username = username
         self._password = password
@@ -126,169 +167,113 @@ class TauronAmiplusConnector:
         self._show_balanced_yearly = show_balanced_yearly
         self._show_configurable = show_configurable
         self._show_configurable_date = show_configurable_date
-        self._session: ClientSession | None = None
-        self._cache = DailyDataCache(meter_id)
+        if account_session is None:
+            if hass is not None and config_entry_id is not None:
+                account_session = get_account_session(hass, username, password)
+            else:
+                account_session = TauronAmiplusAccountSession(hass, username, password, persistent=False)
+        self._account = account_session
+        self._cache = DailyDataCache(meter_id, hass)
+        self._limiter = RequestLimiter(max_concurrent_requests, request_pacing)
+        self._timelines: dict[bool, HourlyTimeline] = {}
+        self._fetched_days = 0
         self._hass = hass
-        self._storage_key = f"{STORAGE_KEY_PREFIX}_{config_entry_id}" if config_entry_id is not None else None
 
     async def get_raw_data(self) -> TauronAmiplusRawData:
+        async with self._account.use_meter(self._meter_id):
+            return await self._get_raw_data()
+
+    async def _get_raw_data(self) -> TauronAmiplusRawData:
         data = TauronAmiplusRawData()
         # data.payments = await self.get_moj_tauron()
         data.tariff = await self.login()
+        self._fetched_days = 0
         generation_max_cache = datetime.datetime.now()
-        data.consumption, consumption_max_cache = await self.get_data_set(generation=False)
         if self._show_generation or self._show_balanced:
-            data.generation, generation_max_cache = await self.get_data_set(generation=True)
+            (data.consumption, consumption_max_cache), (data.generation, generation_max_cache) = \
+                await self._run_parallel(self.get_data_set(generation=False), self.get_data_set(generation=True))
         else:
+            data.consumption, consumption_max_cache = await self.get_data_set(generation=False)
             data.generation = TauronAmiplusDataSet()
         self._cache.delete_older_than(min(consumption_max_cache, generation_max_cache))
+        data.fetched_days = self._fetched_days
+        self.log(f"Fetched {data.fetched_days} days of hourly data")
         return data
 
     async def get_data_set(self, generation) -> Tuple[TauronAmiplusDataSet, datetime.datetime]:
         dataset = TauronAmiplusDataSet()
-        dataset.json_reading = await self.get_reading(generation)
-        dataset.json_daily, dataset.daily_date = await self.get_values_daily(generation)
-        dataset.json_monthly = await self.get_values_monthly(generation)
-        dataset.json_yearly = await self.get_values_yearly(generation)
-        dataset.json_month_hourly = await self.get_values_month_hourly(generation)
-        dataset.json_last_30_days_hourly = await self.get_values_last_30_days_hourly(generation)
         now = datetime.datetime.now()
-        cache_max = datetime.datetime.now() - datetime.timedelta(days=32)
-        if self._show_12_months:
-            dataset.json_last_12_months_hourly = await self.get_values_12_months_hourly(generation)
-            cache_max = now.replace(year=now.year - 1) - datetime.timedelta(days=2)
-        if self._show_balanced_yearly:
-            dataset.json_year_hourly = await self.get_values_year_hourly(generation)
-            potential_max = now.replace(day=1, month=1)
-            if potential_max < cache_max:
-                cache_max = potential_max
-        if self._show_configurable and self._show_configurable_date is not None:
-            end = datetime.datetime.now()
-            start = datetime.datetime.combine(self._show_configurable_date, end.time())
-            dataset.json_configurable_hourly = await self.get_raw_values_daily_for_range(start, end, generation)
-            potential_max = end - datetime.timedelta(days=2)
-            if potential_max < cache_max:
-                cache_max = potential_max
+        windows = self.get_hourly_windows(now)
+        dataset.json_reading, timeline = await self._run_parallel(
+            self.get_reading(generation),
+            self.get_hourly_timeline(windows, now, generation),
+        )
+        # last_30_days_hourly is always one of the windows, so the timeline covers the whole daily lookup range
+        dataset.daily, dataset.daily_date = self.derive_daily_from_timeline(timeline, now, generation)
+        for attribute, (start, end) in windows.items():
+            setattr(dataset, attribute, timeline.slice(start.date(), end.date()))
+        dataset.monthly = self.derive_from_timeline(timeline, now.replace(day=1).date(), now.date(), "monthly", generation)
+        dataset.yearly = self.derive_from_timeline(timeline, now.replace(day=1, month=1).date(), now.date(), "yearly",
+                                                   generation)
+        fallbacks = {}
+        if dataset.monthly is None:
+            fallbacks["monthly"] = self.get_values_monthly(generation)
+        if dataset.yearly is None:
+            fallbacks["yearly"] = self.get_values_yearly(generation)
+        for attribute, value in zip(fallbacks.keys(), await self._run_parallel(*fallbacks.values())):
+            setattr(dataset, attribute, value)
+        cache_max = min([now - datetime.timedelta(days=32),
+                         *[start - datetime.timedelta(days=2) for start, _ in windows.values()]])
         return dataset, cache_max
 
-    async def login_service(self, login_url: str, service: str) -> tuple[ClientSession, str]:
-        success, response, session = await self.try_restore_session(service)
-        if success:
-            return session, response
-
-        self.log(f"Logging in... ({service})")
-        payload_login = {
-            "username": self._username,
-            "password": self._password,
-            "service": service,
+    def get_hourly_windows(self, now: datetime.datetime) -> dict[str, tuple[datetime.datetime, datetime.datetime]]:
+        windows = {
+            "month_hourly": (now.replace(day=1), now),
+            "last_30_days_hourly": (now - datetime.timedelta(days=30), now),
         }
-        r1 = await session.request(
-            "POST",
-            login_url,
-            data=payload_login,
-            headers=CONST_REQUEST_HEADERS,
-        )
-        if "Przekroczono maksymalną liczbę logowań." in await r1.text():
-            self.log("Too many login attempts")
-            raise Exception("Too many login attempts")
-        r2 = await session.request(
-            "POST",
-            login_url,
-            data=payload_login,
-            headers=CONST_REQUEST_HEADERS,
-        )
-        r2_text = await r2.text()
-        if "Przekroczono maksymalną liczbę logowań." in r2_text:
-            self.log("Too many login attempts")
-            raise Exception("Too many login attempts")
-        if "Login lub hasło są nieprawidłowe." in r2_text:
-            self.log("Invalid credentials")
-            raise ConfigEntryAuthFailed("Invalid credentials")
-        if (self._username not in r2_text) and (self._username.upper() not in r2_text):
-            self.log("Failed to login")
-            raise Exception("Failed to login")
-        await self.store_session(session, service)
-        return session, r2_text
-
-    async def try_restore_session(self, service: str) -> (bool, str | None, ClientSession):
-        session = async_create_clientsession(self._hass)
-        if self._storage_key is None or self._hass is None:
-            self.log("NO SESSION TO RESTORE ({service})")
-            return False, None, session
-        self.log(f"RESTORING SESSION {self._storage_key}_{slugify(service)}")
-        store = Store(self._hass, STORAGE_VERSION, f"{self._storage_key}_{slugify(service)}")
-        stored_data = await store.async_load()
-        if stored_data is None:
-            return False, None, session
-        cookies = {k: v for k, v in stored_data.get("cookies", {}).items() if k in ["PHPSESSID", "ASP.NET_SessionId"]}
-        self.log(f"COOKIES ({service}): {cookies}")
-        session.cookie_jar.clear(lambda x: True)
-        session.cookie_jar.update_cookies(cookies)
-
-        success, response = await self.validate_session(session, service)
-        self.log(f"SESSION VALID ({service}): {success}")
-
-        if success:
-            session_to_return = session
-        else:
-            self.log(f"FAILED TO RESTORE SESSION ({service})")
-            self.log(f"INVALID SESSION RESPONSE ({service})")
-            self.log(response)
-            await store.async_save({})
-            session_to_return = async_create_clientsession(self._hass)
-        return success, response, session_to_return
-
-    async def store_session(self, session: ClientSession, service: str) -> None:
-        if self._storage_key is None or self._hass is None:
-            self.log(f"SKIPPING STORING SESSION")
-            return
-        self.log(f"SAVING SESSION {self._storage_key}_{slugify(service)}")
-        store = Store(self._hass, STORAGE_VERSION, f"{self._storage_key}_{slugify(service)}")
-        cookies = {cookie.key: cookie.value for cookie in session.cookie_jar if cookie.key in ["PHPSESSID", "ASP.NET_SessionId"]}
-        self.log(f"SAVED COOKIES ({service}) {cookies}")
-        await store.async_save({"cookies": cookies})
-
-    async def validate_session(self, session: ClientSession, service: str) -> (bool, str):
-        response = await session.get(service)
-        response_text = await response.text()
-        return self._username in response_text or self._username.upper() in response_text.upper(), response_text
+        if self._show_12_months:
+            windows["last_12_months_hourly"] = (now.replace(year=now.year - 1), now)
+        if self._show_balanced_yearly:
+            windows["year_hourly"] = (now.replace(day=1, month=1), now)
+        if self._show_configurable and self._show_configurable_date is not None:
+            windows["configurable_hourly"] = (datetime.datetime.combine(self._show_configurable_date, now.time()), now)
+        return windows
+
+    async def get_hourly_timeline(self, windows: dict, now: datetime.datetime, generation) -> HourlyTimeline:
+        start = min(start for start, _ in windows.values())
+        timeline = self._timelines.setdefault(generation, HourlyTimeline())
+        timeline.set_range(start.date(), now.date())
+        days = [datetime.datetime.combine(day, now.time()) for day in timeline.days_to_refresh()]
+        self.log(f"Refreshing {len(days)} days of hourly timeline, generation: {generation}")
+        days_data = await self.get_raw_values_for_days(days, generation)
+        for day, day_data in zip(days, days_data):
+            timeline.set_day(day.date(), day_data)
+        await async_run_in_executor(self._hass, f"[{self._meter_id}]: Rebuilding hourly timeline", timeline.rebuild)
+        return timeline
+
+    def derive_from_timeline(self, timeline: HourlyTimeline, day_from: datetime.date, day_to: datetime.date, name: str,
+                             generation) -> HourlySeries | None:
+        if timeline.has_gaps(day_from, day_to):
+            self.log(f"Hourly data does not cover {name} data, generation: {generation}")
+            return None
+        self.log(f"Derived {name} data from hourly data, generation: {generation}")
+        return timeline.slice(day_from, day_to)
+
+    def derive_daily_from_timeline(self, timeline: HourlyTimeline, now: datetime.datetime,
+                                   generation) -> Tuple[HourlySeries | None, str | None]:
+        day = timeline.latest_day_with_data((now - datetime.timedelta(days=CONST_MAX_LOOKUP_RANGE)).date(),
+                                            (now - datetime.timedelta(days=1)).date())
+        if day is None:
+            self.log(f"No daily data in the last {CONST_MAX_LOOKUP_RANGE} days, generation: {generation}")
+            return None, None
+        self.log(f"Derived daily data for day {day} from hourly data, generation: {generation}")
+        return timeline.slice(day, day), TauronAmiplusConnector.format_date(day)
 
     async def login(self):
-        session, login_response_text = await self.login_service(CONST_URL_LOGIN, CONST_URL_SERVICE)
-        self._session = session
-        self.log("Logged in to eLicznik.")
-        self.meters = self._get_meters(login_response_text)
-        payload_select_meter = {"site[client]": self._meter_id}
-        selected_meter_info = list(filter(lambda m: m["meter_id"] == self._meter_id, self.meters))
-        if len(selected_meter_info) > 0:
-            self._is_business = selected_meter_info[0]["meter_type"] == "WO"
-        else:
-            self._is_business = False
-        self.log(f"Selecting meter: {self._meter_id}")
-        select_response = await self._session.request("POST", CONST_URL_SELECT_METER, data=payload_select_meter, headers=CONST_REQUEST_HEADERS)
-        select_response_text = await select_response.text()
-        tariff_search = re.findall(r"[^_]Tariff: '(.*)',", select_response_text)
-        if len(tariff_search) > 0:
-            tariff = tariff_search[0]
+        async with self._account.use_meter(self._meter_id) as tariff:
+            self.meters = self._account.meters
+            self._is_business = self._account.is_business(self._meter_id)
             return tariff
-        return "unknown"
-
-    @staticmethod
-    def _get_meters(text: str) -> list:
-        regex = r".*data-data='{\"type\": \".*\"}'>.*"
-        matches = list(re.finditer(regex, text))
-        meters = []
-        for match in matches:
-            m1 = re.match(r".*value=\"([\d\_]+)\".*", match.group())
-            m2 = re.match(r".*\"}'>(.*)</option>", match.group())
-            m3 = re.match(r".*data-data='{\"type\": \"(.*)\"}'>.*", match.group())
-            if m1 is None or m2 is None or m3 is None:
-                continue
-            meter_id = m1.groups()[0]
-            display_name = m2.groups()[0]
-            meter_type = m3.groups()[0]
-            meters.append({"meter_id": meter_id, "meter_name": display_name, "meter_type": meter_type})
-        return meters
 
     async def get_values_yearly(self, generation):
         now = datetime.datetime.now()
@@ -329,65 +314,175 @@ class TauronAmiplusConnector:
             self.log(f"Failed to download monthly data for month: {now.year}.{now.month}, generation: {generation}")
         return values
 
-    async def get_values_daily(self, generation):
-        offset = 1
-        data = None
-        day = None
-        while offset <= CONST_MAX_LOOKUP_RANGE and data is None:
-            data, day = await self.get_raw_values_daily(offset, generation)
-            offset += 1
-        return data, day
+    async def get_statistics_data(self, day_from: datetime.datetime, day_to: datetime.datetime,
+                                  with_generation: bool) -> Tuple[HourlySeries | None, HourlySeries | None]:
+        """Downloads only the hourly data needed to import statistics of the range, reusing the daily cache."""
+        async with self._account.use_meter(self._meter_id):
+            if not with_generation:
+                return await self.get_raw_values_daily_for_range(day_from, day_to, False), None
+            consumption, generation = await self._run_parallel(
+                self.get_raw_values_daily_for_range(day_from, day_to, False),
+                self.get_raw_values_daily_for_range(day_from, day_to, True),
+            )
+            return consumption, generation
+
+    async def get_raw_values_daily_for_range(self, day_from: datetime.date, day_to: datetime.date,
+                                             generation) -> HourlySeries | None:
+        days = [day_from + datetime.timedelta(days=x) for x in range((day_to - day_from).days + 1)]
+        if len(days) == 0:
+            return None
+        async with self._account.use_meter(self._meter_id):
+            await self.login()
+            days_data = await self.get_raw_values_for_days(days, generation)
+        return await async_run_in_executor(self._hass, f"[{self._meter_id}]: Merging {len(days)} days",
+                                           HourlySeries.concat, as_date(day_from), days_data)
+
+    async def get_raw_values_for_days(self, days: list, generation) -> list[HourlySeries | None]:
+        await self._cache.async_load()
+        days_data = {}
+        missing_days = []
+        for day in days:
+            cached_data = self._cache.get_value(day, generation)
+            if cached_data is not None:
+                days_data[self._cache_key(day)] = cached_data
+            else:
+                missing_days.append(day)
+        self._fetched_days += len(missing_days)
+        if len(missing_days) > 0:
+            self.log(f"Cache hit for {len(days) - len(missing_days)} of {len(days)} days, generation: {generation}")
+
+        windows = TauronAmiplusConnector.split_into_windows(missing_days, CONST_RANGE_WINDOW_DAYS)
+        single_days = [window[0] for window in windows if len(window) == 1]
+        windows = [window for window in windows if len(window) > 1]
+        windows_data = await self._gather([self.get_raw_values_for_window(window, generation) for window in windows])
+        for window, window_data in zip(windows, windows_data):
+            for day in window:
+                day_data = window_data.get(self._cache_key(day))
+                if day_data is None:
+                    single_days.append(day)
+                else:
+                    days_data[self._cache_key(day)] = day_data
+
+        single_days_data = await self._gather([self.get_raw_values_daily_for_day(day, generation) for day in single_days])
+        for day, day_data in zip(single_days, single_days_data):
+            days_data[self._cache_key(day)] = day_data
+        return [days_data.get(self._cache_key(day)) for day in days]
+
+    async def get_raw_values_for_window(self, days: list, generation) -> dict[str, HourlySeries]:
+        first_day_str = TauronAmiplusConnector.format_date(days[0])
+        last_day_str = TauronAmiplusConnector.format_date(days[-1])
+        payload = {
+            "from": first_day_str,
+            "to": last_day_str,
+            "profile": "full time",
+            "type": "oze" if generation else "consum",
+            "energy": 2 if generation else 1,
+        }
+        self.log(f"Downloading data for range: {first_day_str} - {last_day_str}, generation: {generation}")
+        values = await self.get_chart_values(payload)
+        days_series = await async_run_in_executor(
+            self._hass, f"[{self._meter_id}]: Parsing range {first_day_str} - {last_day_str}",
+            TauronAmiplusConnector.parse_window_values, values, days)
+        if len(days_series) < len(days):
+            self.log(f"Range {first_day_str} - {last_day_str} returned {len(days_series)} of {len(days)} days, "
+                     f"falling back to daily requests, generation: {generation}")
+        for day in days:
+            day_series = days_series.get(self._cache_key(day))
+            if day_series is not None and day_series.final:
+                self._cache.add_value(day, generation, day_series)
+        return days_series
 
-    async def get_raw_values_daily(self, days_before, generation):
-        day = datetime.datetime.now() - datetime.timedelta(days_before)
-        return await self.get_raw_values_daily_for_day(day, generation), TauronAmiplusConnector.format_date(day)
+    @staticmethod
+    def parse_window_values(values, days: list) -> dict[str, HourlySeries]:
+        days_data = TauronAmiplusConnector.split_window_values(values, days)
+        days_series = {}
+        for day in days:
+            day_key = TauronAmiplusConnector._cache_key(day)
+            if day_key in days_data:
+                days_series[day_key] = HourlySeries.from_json(days_data[day_key], day)
+        return days_series
 
-    async def get_values_month_hourly(self, generation):
-        now = datetime.datetime.now()
-        start_day = now.replace(day=1)
-        return await self.get_raw_values_daily_for_range(start_day, now, generation)
+    @staticmethod
+    def split_window_values(values, days: list) -> dict:
+        if values is None or values["data"].get("allData") is None:
+            return {}
+        rows_by_day = {}
+        for row in values["data"]["allData"]:
+            row_date = TauronAmiplusConnector.parse_row_date(row)
+            if row_date is None:
+                return {}
+            rows_by_day.setdefault(row_date.strftime("%Y-%m-%d"), []).append(row)
+
+        days_data = {}
+        for day in days:
+            day_str = day.strftime("%Y-%m-%d")
+            rows = rows_by_day.get(day_str, [])
+            if len(rows) < CONST_MIN_HOURS_IN_DAY:
+                continue
+            rows.sort(key=lambda r: int(r["Hour"]))
+            zones = {}
+            for row in rows:
+                row["Date"] = day_str
+                zone = str(row["Zone"])
+                zones[zone] = zones.get(zone, 0) + float(row["EC"])
+            day_data = {
+                "success": True,
+                "data": {
+                    "allData": rows,
+                    "sum": sum(zones.values()),
+                    "zones": zones,
+                    "zonesName": values["data"]["zonesName"],
+                },
+            }
+            if "tariff" in values["data"]:
+                day_data["data"]["tariff"] = values["data"]["tariff"]
+            days_data[day_str] = day_data
+        return days_data
 
-    async def get_values_year_hourly(self, generation):
-        now = datetime.datetime.now()
-        start_day = now.replace(day=1, month=1)
-        return await self.get_raw_values_daily_for_range(start_day, now, generation)
+    @staticmethod
+    def parse_row_date(row: dict) -> datetime.date | None:
+        if row is None or row.get("Date") is None:
+            return None
+        date_str = str(row["Date"])[:10]
+        for date_format in ["%Y-%m-%d", CONST_DATE_FORMAT]:
+            try:
+                return datetime.datetime.strptime(date_str, date_format).date()
+            except ValueError:
+                pass
+        return None
 
-    async def get_values_last_30_days_hourly(self, generation):
-        now = datetime.datetime.now()
-        start_day = now - datetime.timedelta(days=30)
-        return await self.get_raw_values_daily_for_range(start_day, now, generation)
+    @staticmethod
+    def split_into_windows(days: list, window_size: int) -> list[list]:
+        windows = []
+        for day in days:
+            if (len(windows) > 0 and len(windows[-1]) < window_size
+                    and (day - windows[-1][-1]) == datetime.timedelta(days=1)):
+                windows[-1].append(day)
+            else:
+                windows.append([day])
+        return windows
 
-    async def get_values_12_months_hourly(self, generation):
-        now = datetime.datetime.now()
-        start_day = now.replace(year=now.year - 1)
-        return await self.get_raw_values_daily_for_range(start_day, now, generation)
-
-    async def get_raw_values_daily_for_range(self, day_from: datetime.date, day_to: datetime.date, generation):
-        data = {"data": {
-            "allData": [],
-            "sum": 0,
-            "zones": {}
-        }}
-        for day in [day_from + datetime.timedelta(days=x) for x in range((day_to - day_from).days + 1)]:
-            day_data = await self.get_raw_values_daily_for_day(day, generation)
-            if day_data is not None:
-                data["data"]["allData"].extend(day_data["data"]["allData"])
-                data["data"]["sum"] += day_data["data"]["sum"]
-                data["data"]["zonesName"] = day_data["data"]["zonesName"]
-                if "tariff" in day_data["data"]:
-                    data["data"]["tariff"] = day_data["data"]["tariff"]
-                for z, v in day_data["data"]["zones"].items():
-                    if z in data["data"]["zones"]:
-                        data["data"]["zones"][z] += v
-                    else:
-                        data["data"]["zones"][z] = v
-
-        if len(data["data"]["allData"]) == 0:
-            return None
-        return data
+    @staticmethod
+    async def _run_parallel(*coroutines) -> list:
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [group.create_task(coroutine) for coroutine in coroutines]
+        except ExceptionGroup as group_error:
+            raise group_error.exceptions[0] from group_error
+        return [task.result() for task in tasks]
+
+    async def _gather(self, coroutines: list) -> list:
+        if self._limiter.concurrent:
+            return await asyncio.gather(*coroutines)
+        return [await coroutine for coroutine in coroutines]
 
-    async def get_raw_values_daily_for_day(self, day, generation):
+    @staticmethod
+    def _cache_key(day) -> str:
+        return day.strftime("%Y-%m-%d")
+
+    async def get_raw_values_daily_for_day(self, day, generation) -> HourlySeries | None:
         day_str = TauronAmiplusConnector.format_date(day)
+        await self._cache.async_load()
         cached_data = self._cache.get_value(day, generation)
         if cached_data is not None:
             self.log(f"Cache hit for day {day_str}, generation: {generation}")
@@ -405,13 +500,11 @@ class TauronAmiplusConnector:
         if values is not None:
             if values['data']['allData'] is None or any(a is None for a in values['data']['allData']):
                 self.add_all_data(values, day)
-            else:
-                for i, v in enumerate(values['data']['allData']):
-                    v['Date'] = day.strftime("%Y-%m-%d")
-            if all(a.get("Status") is not None for a in values['data']['allData']):
-                self._cache.add_value(day, generation, values)
+            day_series = HourlySeries.from_json(values, day)
+            if day_series.final:
+                self._cache.add_value(day, generation, day_series)
             self.log(f"Downloaded daily data for day: {day_str}, generation: {generation}")
-            return values
+            return day_series
         self.log(f"Failed to download daily data for day: {day_str}, generation: {generation}")
         return None
 
@@ -437,21 +530,42 @@ class TauronAmiplusConnector:
         return await self.execute_post(CONST_URL_ENERGY_BUSINESS if self._is_business else CONST_URL_ENERGY, payload)
 
     async def execute_post(self, url: str, payload: dict):
-        self.log(f"EXECUTING: {url} with payload: {payload}")
-        response = await self._session.request(
-            "POST",
-            url,
-            data=payload,
-            headers=CONST_REQUEST_HEADERS,
-        )
-        response_text = await response.text()
-        self.log(f"RESPONSE: {response_text}")
-        if "Przekroczono maksymalną liczbę logowań." in response_text:
+        session = self._account.session
+        try:
+            return await self._execute_post(session, url, payload)
+        except SessionExpiredException:
+            if not await self._account.relogin(session, self._meter_id):
+                self.log(f"Unexpected response, not retrying: {url} with payload: {payload}")
+                return None
+        try:
+            return await self._execute_post(self._account.session, url, payload)
+        except SessionExpiredException:
+            self.log(f"Unexpected response after logging in again: {url} with payload: {payload}")
+            return None
+
+    async def _execute_post(self, session: ClientSession, url: str, payload: dict):
+        debug = _LOGGER.isEnabledFor(logging.DEBUG)
+        if debug:
+            self.log(f"EXECUTING: {url} with payload: {payload}")
+        async with self._limiter.acquire():
+            response = await session.request(
+                "POST",
+                url,
+                data=payload,
+                headers=CONST_REQUEST_HEADERS,
+            )
+            response_bytes = await response.read()
+        if debug:
+            self.log(f"RESPONSE: {response_bytes.decode(errors='replace')}")
+        if _TOO_MANY_LOGINS in response_bytes:
             self.log("Too many login attempts")
             raise Exception("Too many login attempts")
-        if response.status == 200 and response_text.startswith('{"success":true'):
-            json_data = await response.json()
-            self.log(f"RESPONSE JSON: {json_data}")
+        if response.status in [401, 403] or (response.status == 200 and not response_bytes.lstrip().startswith(b"{")):
+            raise SessionExpiredException()
+        if response.status == 200 and response_bytes.startswith(b'{"success":true'):
+            json_data = _json_loads(response_bytes)
+            if debug:
+                self.log(f"RESPONSE JSON: {json_data}")
             return json_data
         return None
 
@@ -459,7 +573,8 @@ class TauronAmiplusConnector:
         _LOGGER.debug(f"[{self._meter_id}]: {msg}")
 
     async def get_moj_tauron(self) -> list[MojTauronPaymentData]:
-        session, response_text = await self.login_service(CONST_URL_LOGIN_MOJ_TAURON, CONST_URL_SERVICE_MOJ_TAURON)
+        session, response_text = await self._account.login_service(CONST_URL_LOGIN_MOJ_TAURON,
+                                                                   CONST_URL_SERVICE_MOJ_TAURON)
         self.log("MÓJ TAURON")
         self.log(response_text)
         if response_text is None:
@@ -487,7 +602,8 @@ class TauronAmiplusConnector:
 
     @staticmethod
     async def get_available_meters(username, password, hass: HomeAssistant):
-        connector = TauronAmiplusConnector(username, password, "placeholder", hass)
+        account_session = TauronAmiplusAccountSession(hass, username, password, persistent=False)
+        connector = TauronAmiplusConnector(username, password, "placeholder", hass, account_session=account_session)
         await connector.login()
         if connector.meters is not None and len(connector.meters) > 0:
             return connector.meters
@@ -495,7 +611,8 @@ class TauronAmiplusConnector:
 
     @staticmethod
     async def calculate_tariff(username, password, meter_id, hass: HomeAssistant):
-        connector = TauronAmiplusConnector(username, password, meter_id, hass)
+        account_session = TauronAmiplusAccountSession(hass, username, password, persistent=False)
+        connector = TauronAmiplusConnector(username, password, meter_id, hass, account_session=account_session)
         tariff = await connector.login()
         if tariff is not None:
             return tariff
@@ -520,13 +637,39 @@ class TauronAmiplusConnector:
         data["data"]["allData"] = all_datas
 
 
+class DailyDataCacheStore(Store):
+
+    async def _async_migrate_func(self, old_major_version, old_minor_version, old_data):
+        if old_major_version == 1:
+            return {
+                **old_data,
+                CONST_CONSUMPTION: DailyDataCacheStore._migrate_days(old_data.get(CONST_CONSUMPTION, {})),
+                CONST_GENERATION: DailyDataCacheStore._migrate_days(old_data.get(CONST_GENERATION, {})),
+            }
+        # Cached days can always be downloaded again, so incompatible schemas are simply dropped
+        return {}
+
+    @staticmethod
+    def _migrate_days(days: dict) -> dict:
+        return {
+            date_str: HourlySeries.from_json(value, datetime.date.fromisoformat(date_str)).to_dict()
+            for date_str, value in days.items()
+        }
+
+
 class DailyDataCache:
 
-    def __init__(self, meter_id):
+    def __init__(self, meter_id, hass: HomeAssistant | None = None):
         self._consumption_data = dict()
         self._generation_data = dict()
         self._max_date = datetime.datetime.now() + datetime.timedelta(days=1)
         self._meter_id = meter_id
+        self._store: DailyDataCacheStore | None = None
+        if hass is not None:
+            self._store = DailyDataCacheStore(hass, CACHE_STORAGE_VERSION,
+                                              f"{CACHE_STORAGE_KEY_PREFIX}_{slugify(meter_id)}")
+        self._loaded = self._store is None
+        self._load_lock = asyncio.Lock()
 
     def __contains__(self, item: Tuple[str, bool]):
         date_str, generation = item
@@ -534,7 +677,31 @@ class DailyDataCache:
             return date_str in self._generation_data
         return date_str in self._consumption_data
 
-    def add_value(self, date: datetime.datetime, generation: bool, value):
+    async def async_load(self):
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            stored_data = await self._store.async_load()
+            self._loaded = True
+            if not stored_data:
+                return
+            oldest_date = datetime.datetime.now() - datetime.timedelta(days=CACHE_MAX_AGE_DAYS)
+            loaded = 0
+            for key, target in [(CONST_CONSUMPTION, self._consumption_data),
+                                (CONST_GENERATION, self._generation_data)]:
+                for date_str, value in stored_data.get(key, {}).items():
+                    date = datetime.datetime.strptime(date_str, "%Y-%m-%d")
+                    if date < oldest_date or date_str in target:
+                        continue
+                    target[date_str] = HourlySeries.from_dict(value)
+                    loaded += 1
+                    if self._max_date > date:
+                        self._max_date = date
+            self.log(f"Loaded {loaded} days from persistent cache")
+
+    def add_value(self, date: datetime.datetime, generation: bool, value: HourlySeries):
         date_str = self._format_date(date)
         if value is None:
             return
@@ -544,8 +711,9 @@ class DailyDataCache:
             self._consumption_data[date_str] = value
         if self._max_date is None or self._max_date > date:
             self._max_date = date
+        self._schedule_save()
 
-    def get_value(self, date: datetime.datetime, generation: bool):
+    def get_value(self, date: datetime.datetime, generation: bool) -> HourlySeries | None:
         date_str = self._format_date(date)
         if (date_str, generation) in self:
             if generation:
@@ -558,6 +726,7 @@ class DailyDataCache:
             for d in [self._max_date + datetime.timedelta(days=x) for x in range((date - self._max_date).days)]:
                 self.delete_day(d)
             self._max_date = date
+            self._schedule_save()
 
     def delete_day(self, date: datetime.datetime):
         date_str = self._format_date(date)
@@ -567,6 +736,17 @@ class DailyDataCache:
         if date_str in self._consumption_data:
             self._consumption_data.pop(date_str)
 
+    def _schedule_save(self):
+        if self._store is not None and self._loaded:
+            self._store.async_delay_save(self._data_to_save, CACHE_SAVE_DELAY)
+
+    def _data_to_save(self) -> dict:
+        return {
+            "meter_id": self._meter_id,
+            CONST_CONSUMPTION: {k: v.to_dict() for k, v in self._consumption_data.items()},
+            CONST_GENERATION: {k: v.to_dict() for k, v in self._generation_data.items()},
+        }
+
     @staticmethod
     def _format_date(date):
         return date.strftime("%Y-%m-%d")
@@ -9,6 +9,8 @@ DOMAIN = "tauron_amiplus"
 STATISTICS_DOMAIN = "tauron_importer"
 DEFAULT_NAME = "Tauron AMIplus"
 DATA_TAURON_CLIENT = "data_client"
+DATA_SESSIONS = "sessions"
+DATA_ACCOUNT_COORDINATORS = "account_coordinators"
 CONF_METER_ID = "energy_meter_id"
 CONF_METER_NAME = "energy_meter_name"
 CONF_TARIFF = "tariff"
@@ -21,6 +23,14 @@ CONF_SHOW_CONFIGURABLE_DATE = "show_configurable_sensors_date"
 CONF_STORE_STATISTICS = "store_statistics"
 CONST_DATE_FORMAT = "%d.%m.%Y"
 CONST_MAX_LOOKUP_RANGE = 7
+CONST_MIN_RELOGIN_INTERVAL = timedelta(minutes=10)
+DEFAULT_MAX_CONCURRENT_REQUESTS = 4
+DEFAULT_REQUEST_PACING = 0.1
+CONST_RANGE_WINDOW_DAYS = 31
+CONST_MIN_HOURS_IN_DAY = 23
+CONST_STATISTICS_CHUNK_DAYS = 7
+CONST_TIME_ZONE = "Europe/Warsaw"
+CONST_HOUR_STARTS_CACHE_SIZE = 800
 CONST_URL_LOGIN = "https://logowanie.tauron-dystrybucja.pl/login"
 CONST_URL_SERVICE = "https://elicznik.tauron-dystrybucja.pl"
 CONST_URL_LOGIN_MOJ_TAURON = "https://logowanie.tauron.pl/login"
@@ -41,6 +51,21 @@ CONST_LAST_12_MONTHS = "last_12_months"
 CONST_CONFIGURABLE = "configurable"
 STORAGE_VERSION = 1
 STORAGE_KEY_PREFIX = f"{DOMAIN}_session_data"
+CACHE_STORAGE_VERSION = 2
+CACHE_STORAGE_KEY_PREFIX = f"{DOMAIN}_daily_cache"
+CACHE_MAX_AGE_DAYS = 400
+CACHE_SAVE_DELAY = 30
+SCHEDULER_STORAGE_VERSION = 1
+SCHEDULER_STORAGE_KEY_PREFIX = f"{DOMAIN}_scheduler"
+SCHEDULER_SAVE_DELAY = 30
+WATERMARKS_STORAGE_VERSION = 1
+WATERMARKS_STORAGE_KEY_PREFIX = f"{DOMAIN}_statistics_watermarks"
+WATERMARKS_SAVE_DELAY = 10
+BACKFILL_STORAGE_VERSION = 1
+BACKFILL_STORAGE_KEY_PREFIX = f"{DOMAIN}_backfill"
+BACKFILL_RETRY_DELAY = 15 * 60
+BACKFILL_MAX_RETRIES = 4
+EVENT_BACKFILL_PROGRESS = f"{DOMAIN}_backfill_progress"
 TYPE_BALANCED_DAILY = f"{CONST_BALANCED}_{CONST_DAILY}"
 TYPE_BALANCED_MONTHLY = f"{CONST_BALANCED}_{CONST_MONTHLY}"
 TYPE_BALANCED_YEARLY = f"{CONST_BALANCED}_{CONST_YEARLY}"
@@ -62,6 +87,11 @@ TYPE_AMOUNT = "moj_tauron"
 TYPE_AMOUNT_PAYMENT = f"{TYPE_AMOUNT}_PAYMENT"
 
 DEFAULT_UPDATE_INTERVAL = timedelta(hours=8, minutes=30)
+CONST_SCHEDULER_SAMPLES = 14
+CONST_SCHEDULER_MAX_SAMPLE_GAP = timedelta(hours=3)
+CONST_SCHEDULER_MIN_WINDOW = timedelta(minutes=30)
+CONST_SCHEDULER_WINDOW_INTERVAL = timedelta(minutes=30)
+CONST_SCHEDULER_WAITING_INTERVAL = timedelta(hours=2)
 SENSOR_TYPES_YAML = {
     TYPE_CONSUMPTION_READING: {
         "name": "Current consumption reading",
@@ -1,13 +1,22 @@
 """Update coordinator for TAURON sensors."""
+import asyncio
 import datetime
 import logging
+from typing import Callable
 
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
+from .backfill import TauronAmiplusBackfill
 from .connector import TauronAmiplusConnector, TauronAmiplusRawData
-from .const import (DEFAULT_UPDATE_INTERVAL, DOMAIN)
+from .const import (CONST_DATE_FORMAT, DATA_ACCOUNT_COORDINATORS, DEFAULT_UPDATE_INTERVAL, DOMAIN)
+from .pipeline import TauronAmiplusPipelineStage
+from .scheduler import TauronAmiplusUpdateScheduler
+from .session import TauronAmiplusAccountSession
 from .statistics import TauronAmiplusStatisticsUpdater
+from .watermarks import TauronAmiplusStatisticsWatermarks
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -43,24 +52,155 @@ class TauronAmiplusUpdateCoordinator(DataUpdateCoordinator[TauronAmiplusRawData]
         self.show_configurable = show_configurable
         self.show_configurable_date = show_configurable_date
         self.store_statistics = store_statistics
+        self.statistics_watermarks = TauronAmiplusStatisticsWatermarks(hass, meter_id)
+        # Regular imports and the backfill write the same statistics and watermarks, only one of them runs at a time
+        self.statistics_lock = asyncio.Lock()
+        self.backfill = TauronAmiplusBackfill(hass, config_entry_id, meter_id, self.statistics_lock)
+        self.statistics_stage: TauronAmiplusPipelineStage[TauronAmiplusRawData] = TauronAmiplusPipelineStage(
+            hass, f"tauron_amiplus_statistics_{meter_id}", self.generate_statistics)
+        self.account_coordinator: TauronAmiplusAccountCoordinator | None = None
+        self.account_update_error: Exception | None = None
 
     async def update_method(self) -> TauronAmiplusRawData:
+        if self.account_coordinator is not None:
+            self.log("Requesting account data update")
+            await self.account_coordinator.async_request_refresh()
+            error = self.account_update_error
+            if isinstance(error, ConfigEntryAuthFailed):
+                raise error
+            if error is not None:
+                raise UpdateFailed(f"Failed to update meter {self.meter_id}: {error}") from error
+            return self.data
         self.log("Starting data update")
         data = await self._update()
         self.log("Downloaded all data")
+        self.process_data(data)
+        return data
+
+    def process_data(self, data: TauronAmiplusRawData):
         if data is not None and self.store_statistics:
+            self.statistics_stage.submit(data)
+
+    async def generate_statistics(self, data: TauronAmiplusRawData):
+        async with self.statistics_lock:
+            if self.backfill.running:
+                self.log("Skipping statistics update, backfill in progress")
+                return
             self.log("Starting statistics update")
-            await self.generate_statistics(data)
+            await self.create_statistics_updater().update_all(data)
             self.log("Updated all statistics")
-        return data
 
-    async def generate_statistics(self, data):
-        statistics_updater = TauronAmiplusStatisticsUpdater(self.hass, self.connector, self.meter_id, self.meter_name,
-                                                            self.show_generation, self.show_balanced)
-        await statistics_updater.update_all(data)
+    def create_statistics_updater(self) -> TauronAmiplusStatisticsUpdater:
+        return TauronAmiplusStatisticsUpdater(self.hass, self.connector, self.meter_id, self.meter_name,
+                                              self.show_generation, self.show_balanced, self.statistics_watermarks)
 
     async def _update(self) -> TauronAmiplusRawData:
         return await self.connector.get_raw_data()
 
+    @property
+    def scheduler_attributes(self) -> dict:
+        if self.account_coordinator is None:
+            return {}
+        return self.account_coordinator.scheduler.attributes
+
     def log(self, msg):
         _LOGGER.debug(f"[{self.meter_id}]: {msg}")
+
+
+class TauronAmiplusAccountCoordinator(DataUpdateCoordinator[dict[str, TauronAmiplusRawData]]):
+    """Refreshes all meters of one eLicznik account in a single pass and fans results out to their coordinators."""
+
+    def __init__(self, hass: HomeAssistant, account_session: TauronAmiplusAccountSession):
+        super().__init__(hass, _LOGGER, config_entry=None, name=f"{DOMAIN}_account",
+                         update_interval=DEFAULT_UPDATE_INTERVAL, update_method=self.update_method)
+        self.account_session = account_session
+        self.scheduler = TauronAmiplusUpdateScheduler(hass, account_session.username)
+        self.meter_coordinators: dict[str, TauronAmiplusUpdateCoordinator] = {}
+        self._remove_listeners: dict[str, Callable[[], None]] = {}
+
+    def register(self, config_entry_id: str, coordinator: TauronAmiplusUpdateCoordinator):
+        coordinator.update_interval = None
+        coordinator.account_coordinator = self
+        self.meter_coordinators[config_entry_id] = coordinator
+        # Refreshes are only scheduled while the coordinator has listeners
+        self._remove_listeners[config_entry_id] = self.async_add_listener(lambda: None)
+
+    def unregister(self, config_entry_id: str) -> bool:
+        coordinator = self.meter_coordinators.pop(config_entry_id, None)
+        if coordinator is not None:
+            coordinator.account_coordinator = None
+        remove_listener = self._remove_listeners.pop(config_entry_id, None)
+        if remove_listener is not None:
+            remove_listener()
+        return len(self.meter_coordinators) == 0
+
+    async def update_method(self) -> dict[str, TauronAmiplusRawData]:
+        await self.scheduler.async_load()
+        now = dt_util.now()
+        results = {}
+        errors = {}
+        for config_entry_id, coordinator in self.ordered_coordinators():
+            self.log(f"Starting data update for meter: {coordinator.meter_id}")
+            try:
+                results[config_entry_id] = await coordinator.connector.get_raw_data()
+            except ConfigEntryAuthFailed as err:
+                self.set_auth_failed(err)
+                raise
+            except Exception as err:
+                _LOGGER.error("Failed to update meter %s: %s", coordinator.meter_id, err)
+                errors[config_entry_id] = err
+        self.log(f"Downloaded data for {len(results)} of {len(self.meter_coordinators)} meters")
+        self.scheduler.observe(now, self.latest_final_date(results.values()))
+        self.update_interval = self.scheduler.plan(dt_util.now())
+
+        for config_entry_id, coordinator in list(self.meter_coordinators.items()):
+            if config_entry_id in results:
+                coordinator.account_update_error = None
+                coordinator.async_set_updated_data(results[config_entry_id])
+                coordinator.process_data(results[config_entry_id])
+            elif config_entry_id in errors:
+                coordinator.account_update_error = errors[config_entry_id]
+                coordinator.async_set_update_error(errors[config_entry_id])
+        if len(results) == 0 and len(errors) > 0:
+            raise UpdateFailed(f"Failed to update all meters: {next(iter(errors.values()))}")
+        return results
+
+    def set_auth_failed(self, err: ConfigEntryAuthFailed):
+        for coordinator in self.meter_coordinators.values():
+            coordinator.account_update_error = err
+            coordinator.async_set_update_error(err)
+            if coordinator.config_entry is not None:
+                coordinator.config_entry.async_start_reauth(self.hass)
+
+    @staticmethod
+    def latest_final_date(results) -> datetime.date | None:
+        final_dates = [
+            datetime.datetime.strptime(data.consumption.daily_date, CONST_DATE_FORMAT).date()
+            for data in results
+            if data.consumption.daily is not None and data.consumption.daily.final
+        ]
+        return max(final_dates, default=None)
+
+    def ordered_coordinators(self) -> list[tuple[str, TauronAmiplusUpdateCoordinator]]:
+        selected_meter_id = self.account_session.selected_meter_id
+        return sorted(self.meter_coordinators.items(),
+                      key=lambda item: (item[1].meter_id != selected_meter_id, item[1].meter_id))
+
+    def log(self, msg):
+        _LOGGER.debug(f"[{self.account_session.username}]: {msg}")
+
+
+def get_account_coordinator(hass: HomeAssistant,
+                            account_session: TauronAmiplusAccountSession) -> TauronAmiplusAccountCoordinator:
+    coordinators = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_ACCOUNT_COORDINATORS, {})
+    if account_session.username not in coordinators:
+        coordinators[account_session.username] = TauronAmiplusAccountCoordinator(hass, account_session)
+    return coordinators[account_session.username]
+
+
+async def async_release_account_coordinator(hass: HomeAssistant, username: str, config_entry_id: str):
+    coordinators = hass.data.get(DOMAIN, {}).get(DATA_ACCOUNT_COORDINATORS, {})
+    account_coordinator = coordinators.get(username)
+    if account_coordinator is not None and account_coordinator.unregister(config_entry_id):
+        await account_coordinator.async_shutdown()
+        coordinators.pop(username)
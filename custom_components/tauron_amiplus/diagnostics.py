@@ -5,6 +5,7 @@ from homeassistant.core import HomeAssistant
 from .const import (CONF_SHOW_12_MONTHS, CONF_SHOW_BALANCED, CONF_SHOW_BALANCED_YEAR,
                     CONF_SHOW_CONFIGURABLE, CONF_SHOW_CONFIGURABLE_DATE, CONF_SHOW_GENERATION, CONF_STORE_STATISTICS,
                     CONF_TARIFF)
+from .series import HourlySeries
 from .typing_helpers import TauronAmiplusConfigEntry
 
 
@@ -22,7 +23,8 @@ async def get_config_entry_diagnostics(hass: HomeAssistant, entry: TauronAmiplus
     show_configurable_date = entry.options.get(CONF_SHOW_CONFIGURABLE_DATE, False)
     store_statistics = entry.options.get(CONF_STORE_STATISTICS, False)
 
-    connector = entry.runtime_data.coordinator.connector
+    coordinator = entry.runtime_data.coordinator
+    connector = coordinator.connector
     raw_data = await connector.get_raw_data()
 
     return {
@@ -34,23 +36,31 @@ async def get_config_entry_diagnostics(hass: HomeAssistant, entry: TauronAmiplus
         "show_configurable": show_configurable,
         "show_configurable_date": show_configurable_date,
         "store_statistics": store_statistics,
+        "update_scheduler": coordinator.scheduler_attributes,
         "raw_data_tariff": raw_data.tariff,
+        "raw_data_fetched_days": raw_data.fetched_days,
         "raw_data_consumption": {
             "json_reading": raw_data.consumption.json_reading,
-            "json_daily": raw_data.consumption.json_daily,
+            "json_daily": to_json(raw_data.consumption.daily),
             "daily_date": raw_data.consumption.daily_date,
-            "json_monthly": raw_data.consumption.json_monthly,
-            "json_yearly": raw_data.consumption.json_yearly,
-            "json_month_hourly": raw_data.consumption.json_month_hourly,
-            "json_last_30_days_hourly": raw_data.consumption.json_last_30_days_hourly,
+            "json_monthly": to_json(raw_data.consumption.monthly),
+            "json_yearly": to_json(raw_data.consumption.yearly),
+            "json_month_hourly": to_json(raw_data.consumption.month_hourly),
+            "json_last_30_days_hourly": to_json(raw_data.consumption.last_30_days_hourly),
         },
         "raw_data_generation": {
             "json_reading": raw_data.generation.json_reading,
-            "json_daily": raw_data.generation.json_daily,
+            "json_daily": to_json(raw_data.generation.daily),
             "daily_date": raw_data.generation.daily_date,
-            "json_monthly": raw_data.generation.json_monthly,
-            "json_yearly": raw_data.generation.json_yearly,
-            "json_month_hourly": raw_data.generation.json_month_hourly,
-            "json_last_30_days_hourly": raw_data.generation.json_last_30_days_hourly,
+            "json_monthly": to_json(raw_data.generation.monthly),
+            "json_yearly": to_json(raw_data.generation.yearly),
+            "json_month_hourly": to_json(raw_data.generation.month_hourly),
+            "json_last_30_days_hourly": to_json(raw_data.generation.last_30_days_hourly),
         }
     }
+
+
+def to_json(value: HourlySeries | dict | None) -> dict | None:
+    if isinstance(value, HourlySeries):
+        return value.to_json()
+    return value
@@ -0,0 +1,33 @@
+"""Running CPU-heavy work off the event loop."""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, TypeVar
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+async def async_run_in_executor(hass: HomeAssistant | None, name: str, func: Callable[..., T], *args) -> T:
+    """Runs the function in the executor, or inline when there is no Home Assistant instance, and logs its duration."""
+    start = time.perf_counter()
+    if hass is None:
+        result = func(*args)
+        _LOGGER.debug("%s: %.3f s on the event loop", name, time.perf_counter() - start)
+    else:
+        result = await hass.async_add_executor_job(func, *args)
+        _LOGGER.debug("%s: %.3f s in the executor", name, time.perf_counter() - start)
+    return result
+
+
+@contextmanager
+def log_blocking_time(name: str):
+    """Logs how long the block kept the event loop busy."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _LOGGER.debug("%s: %.3f s on the event loop", name, time.perf_counter() - start)
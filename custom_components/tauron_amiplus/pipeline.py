@@ -0,0 +1,51 @@
+"""Background stage consuming coordinator data snapshots."""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TauronAmiplusPipelineStage(Generic[T]):
+    """Processes submitted snapshots in a background task, only the newest one is kept while a run is in progress."""
+
+    def __init__(self, hass: HomeAssistant, name: str, process: Callable[[T], Awaitable[None]]):
+        self._hass = hass
+        self._name = name
+        self._process = process
+        self._pending: T | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def submit(self, snapshot: T):
+        if self.running and self._pending is not None:
+            _LOGGER.debug("%s: replacing pending snapshot", self._name)
+        self._pending = snapshot
+        if not self.running:
+            self._task = self._hass.async_create_background_task(self._run(), self._name)
+
+    async def async_stop(self):
+        self._pending = None
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        while self._pending is not None:
+            snapshot = self._pending
+            self._pending = None
+            try:
+                await self._process(snapshot)
+            except Exception:
+                _LOGGER.exception("%s: processing failed", self._name)
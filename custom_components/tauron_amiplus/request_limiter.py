@@ -0,0 +1,35 @@
+"""Request limiter for TAURON eLicznik API."""
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class RequestLimiter:
+
+    def __init__(self, max_concurrent_requests: int, request_pacing: float):
+        self.max_concurrent_requests = max(1, max_concurrent_requests)
+        self._request_pacing = request_pacing
+        self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        self._pacing_lock = asyncio.Lock()
+        self._next_request_time = 0.0
+
+    @property
+    def concurrent(self) -> bool:
+        return self.max_concurrent_requests > 1
+
+    @asynccontextmanager
+    async def acquire(self):
+        async with self._semaphore:
+            await self._wait_for_pacing()
+            yield
+
+    async def _wait_for_pacing(self):
+        if self._request_pacing <= 0:
+            return
+        async with self._pacing_lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            delay = self._next_request_time - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+                now += delay
+            self._next_request_time = now + self._request_pacing
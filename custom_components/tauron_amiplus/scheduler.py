@@ -0,0 +1,134 @@
+"""Update scheduling aligned to the time eLicznik publishes data of the previous day."""
+import datetime
+import logging
+import statistics
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import (
+    CONST_SCHEDULER_MAX_SAMPLE_GAP,
+    CONST_SCHEDULER_MIN_WINDOW,
+    CONST_SCHEDULER_SAMPLES,
+    CONST_SCHEDULER_WAITING_INTERVAL,
+    CONST_SCHEDULER_WINDOW_INTERVAL,
+    DEFAULT_UPDATE_INTERVAL,
+    SCHEDULER_SAVE_DELAY,
+    SCHEDULER_STORAGE_KEY_PREFIX,
+    SCHEDULER_STORAGE_VERSION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TauronAmiplusUpdateScheduler:
+    """Learns when data of the previous day becomes final and polls more often around that time."""
+
+    def __init__(self, hass: HomeAssistant, username: str):
+        self._username = username
+        self._store = Store(hass, SCHEDULER_STORAGE_VERSION, f"{SCHEDULER_STORAGE_KEY_PREFIX}_{slugify(username)}")
+        self._loaded = False
+        self._samples: list[int] = []
+        self._last_final_date: datetime.date | None = None
+        self._last_check: datetime.datetime | None = None
+        self.next_update: datetime.datetime | None = None
+        self.reason: str | None = None
+
+    async def async_load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        stored_data = await self._store.async_load()
+        if stored_data is None:
+            return
+        self._samples = stored_data.get("samples", [])
+        last_final_date = stored_data.get("last_final_date")
+        if last_final_date is not None:
+            self._last_final_date = datetime.date.fromisoformat(last_final_date)
+
+    def observe(self, now: datetime.datetime, final_date: datetime.date | None):
+        """Records the newest day with final daily data seen by the update started at the given time."""
+        previous_check = self._last_check
+        self._last_check = now
+        if final_date is None or (self._last_final_date is not None and final_date <= self._last_final_date):
+            return
+        is_new_publication = (
+            self._last_final_date is not None
+            and final_date == now.date() - datetime.timedelta(days=1)
+            and previous_check is not None
+            and now - previous_check <= CONST_SCHEDULER_MAX_SAMPLE_GAP
+        )
+        self._last_final_date = final_date
+        if is_new_publication:
+            self._samples = [*self._samples, now.hour * 60 + now.minute][-CONST_SCHEDULER_SAMPLES:]
+            self.log(f"Data for {final_date} published at {now.strftime('%H:%M')}")
+        self._store.async_delay_save(self._data_to_save, SCHEDULER_SAVE_DELAY)
+
+    def publication_window(self) -> tuple[int, int] | None:
+        """Returns the expected publication window in minutes after midnight."""
+        if len(self._samples) == 0:
+            return None
+        median = statistics.median(self._samples)
+        deviation = statistics.median(abs(sample - median) for sample in self._samples)
+        half_width = max(CONST_SCHEDULER_MIN_WINDOW.total_seconds() / 60, 2 * deviation)
+        return max(int(median - half_width), 0), min(int(median + half_width), 24 * 60 - 1)
+
+    def plan(self, now: datetime.datetime) -> datetime.timedelta:
+        expected_date = now.date() - datetime.timedelta(days=1)
+        window = self.publication_window()
+        if self._last_final_date is not None and self._last_final_date >= expected_date:
+            if window is None:
+                interval = DEFAULT_UPDATE_INTERVAL
+                reason = f"Data for {expected_date} is already published"
+            else:
+                next_window_start = self._at_minute(now.date() + datetime.timedelta(days=1), window[0])
+                interval = min(next_window_start - now, DEFAULT_UPDATE_INTERVAL)
+                reason = f"Data for {expected_date} is already published, waiting for the next publication window"
+        elif window is None:
+            interval = CONST_SCHEDULER_WAITING_INTERVAL
+            reason = f"Waiting for data for {expected_date}, publication time is not known yet"
+        else:
+            window_start = self._at_minute(now.date(), window[0])
+            window_end = self._at_minute(now.date(), window[1])
+            if now < window_start:
+                interval = min(max(window_start - now, CONST_SCHEDULER_WINDOW_INTERVAL), DEFAULT_UPDATE_INTERVAL)
+                reason = f"Waiting for data for {expected_date}, publication window has not started yet"
+            elif now <= window_end:
+                interval = CONST_SCHEDULER_WINDOW_INTERVAL
+                reason = f"Waiting for data for {expected_date} within the publication window"
+            else:
+                interval = CONST_SCHEDULER_WAITING_INTERVAL
+                reason = f"Waiting for data for {expected_date}, publication window has already passed"
+        self.next_update = now + interval
+        self.reason = reason
+        self.log(f"Next update at {self.next_update}: {reason}")
+        return interval
+
+    @property
+    def attributes(self) -> dict:
+        window = self.publication_window()
+        return {
+            "next_update": self.next_update.isoformat() if self.next_update is not None else None,
+            "next_update_reason": self.reason,
+            "publication_window": f"{self._format_minute(window[0])} - {self._format_minute(window[1])}"
+            if window is not None else None,
+            "publication_samples": len(self._samples),
+        }
+
+    def _data_to_save(self) -> dict:
+        return {
+            "samples": self._samples,
+            "last_final_date": self._last_final_date.isoformat() if self._last_final_date is not None else None,
+        }
+
+    @staticmethod
+    def _at_minute(day: datetime.date, minute: int) -> datetime.datetime:
+        return dt_util.start_of_local_day(day) + datetime.timedelta(minutes=minute)
+
+    @staticmethod
+    def _format_minute(minute: int) -> str:
+        return f"{minute // 60:02d}:{minute % 60:02d}"
+
+    def log(self, msg):
+        _LOGGER.debug(f"[{self._username}]: {msg}")
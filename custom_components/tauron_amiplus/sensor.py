@@ -8,6 +8,7 @@ from homeassistant.components.sensor import PLATFORM_SCHEMA, SensorDeviceClass,
 from homeassistant.const import CONF_MONITORED_VARIABLES, CONF_NAME, CONF_PASSWORD, CONF_USERNAME, UnitOfEnergy
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .aggregates import TauronAmiplusBalanceSummary, TauronAmiplusSummary
 from .connector import TauronAmiplusRawData
 from .const import (CONF_METER_ID, CONF_METER_NAME, CONF_SHOW_12_MONTHS, CONF_SHOW_BALANCED, CONF_SHOW_BALANCED_YEAR,
                     CONF_SHOW_CONFIGURABLE, CONF_SHOW_CONFIGURABLE_DATE, CONF_SHOW_GENERATION, CONF_TARIFF,
@@ -178,17 +179,17 @@ class TauronAmiplusSensor(SensorEntity, CoordinatorEntity):
             self.update_balanced_data(data.balance_configurable_hourly)
         elif self._sensor_type.endswith(CONST_READING) and dataset.json_reading is not None:
             self.update_reading(dataset.json_reading)
-        elif self._sensor_type.endswith(CONST_DAILY) and dataset.json_daily is not None:
-            self.update_values(dataset.json_daily)
-            self._params = {"date": dataset.daily_date, **self._params}
-        elif self._sensor_type.endswith(CONST_MONTHLY) and dataset.json_monthly is not None:
-            self.update_values(dataset.json_monthly)
-        elif self._sensor_type.endswith(CONST_YEARLY) and dataset.json_yearly is not None:
-            self.update_values(dataset.json_yearly)
-        elif self._sensor_type.endswith(CONST_LAST_12_MONTHS) and dataset.json_last_12_months_hourly is not None:
-            self.update_values(dataset.json_last_12_months_hourly)
-        elif self._sensor_type.endswith(CONST_CONFIGURABLE) and dataset.json_configurable_hourly is not None:
-            self.update_values(dataset.json_configurable_hourly)
+        elif self._sensor_type.endswith(CONST_DAILY) and dataset.daily is not None:
+            self.update_values(data.get_summary(self._generation, "daily"))
+            self._params = {"date": dataset.daily_date, **self._params, **self.coordinator.scheduler_attributes}
+        elif self._sensor_type.endswith(CONST_MONTHLY) and dataset.monthly is not None:
+            self.update_values(data.get_summary(self._generation, "monthly"))
+        elif self._sensor_type.endswith(CONST_YEARLY) and dataset.yearly is not None:
+            self.update_values(data.get_summary(self._generation, "yearly"))
+        elif self._sensor_type.endswith(CONST_LAST_12_MONTHS) and dataset.last_12_months_hourly is not None:
+            self.update_values(data.get_summary(self._generation, "last_12_months_hourly"))
+        elif self._sensor_type.endswith(CONST_CONFIGURABLE) and dataset.configurable_hourly is not None:
+            self.update_values(data.get_summary(self._generation, "configurable_hourly"))
         self.async_write_ha_state()
 
     def update_reading(self, json_data):
@@ -197,79 +198,20 @@ class TauronAmiplusSensor(SensorEntity, CoordinatorEntity):
         partials = {s: reading[s] for s in ["S1", "S2", "S3"] if s in reading and reading[s] is not None}
         self._params = {"date": reading["Date"], **partials}
 
-    def update_values(self, json_data):
-        total, zones, data_range = TauronAmiplusSensor.get_data_from_json(json_data)
-        self._state = total
-        self._params = {**zones, "data_range": data_range}
+    def update_values(self, summary: TauronAmiplusSummary):
+        self._state = summary.total
+        self._params = {**summary.zones, "data_range": summary.data_range}
         self._params = {k: v for k, v in self._params.items() if v is not None}
 
-    def update_balanced_data(self, balanced_data):
-        con = balanced_data[0]
-        gen = balanced_data[1]
-        balance, sum_consumption, sum_generation, zones, data_range = TauronAmiplusSensor.get_balanced_data(con, gen)
-        self._state = round(balance, 3)
+    def update_balanced_data(self, summary: TauronAmiplusBalanceSummary):
+        self._state = summary.balance
         self._params = {
-            "sum_consumption": round(sum_consumption, 3),
-            "sum_generation": round(sum_generation, 3),
-            "data_range": data_range,
-            **{k: round(v, 3) for (k, v) in zones.items()},
+            "sum_consumption": summary.sum_consumption,
+            "sum_generation": summary.sum_generation,
+            "data_range": summary.data_range,
+            **summary.zones,
         }
 
-    @staticmethod
-    def get_data_from_json(json_data):
-        total = round(json_data["data"]["sum"], 3)
-        zones = {}
-        data_range = None
-        if (
-            "zones" in json_data["data"]
-            and len(json_data["data"]["zones"]) > 0
-            and "zonesName" in json_data["data"]
-            and len(json_data["data"]["zonesName"]) > 0
-        ):
-            zones = {v: round(json_data["data"]["zones"].get(k, 0), 3) for (k, v) in json_data["data"]["zonesName"].items()}
-        if (
-            "allData" in json_data["data"]
-            and len(json_data["data"]["allData"]) > 0
-            and "Date" in json_data["data"]["allData"][0]
-        ):
-            consumption_data = json_data["data"]["allData"]
-            data_range = f"{consumption_data[0]['Date']} - {consumption_data[-1]['Date']}"
-        return total, zones, data_range
-
-    @staticmethod
-    def get_balanced_data(consumption_data_json, generation_data_json):
-        zone_names = consumption_data_json["data"]["zonesName"]
-        consumption_data = consumption_data_json["data"]["allData"]
-        generation_data = generation_data_json["data"]["allData"]
-        if len(consumption_data) == 0 or len(generation_data) == 0:
-            return 0, 0, 0, {}, ""
-        data_range = f"{consumption_data[0]['Date']} - {consumption_data[-1]['Date']}"
-
-        sum_consumption = 0
-        sum_generation = 0
-        zones = {}
-
-        for consumption, generation in zip(consumption_data, generation_data):
-            value_consumption = float(consumption["EC"])
-            value_generation = float(generation["EC"])
-            zone = zone_names[consumption["Zone"]]
-            balance = value_consumption - value_generation
-            if balance > 0:
-                sum_consumption += balance
-                zone_key = f"{zone}_consumption"
-                if zone_key not in zones:
-                    zones[zone_key] = 0
-                zones[zone_key] += balance
-            else:
-                sum_generation += balance
-                zone_key = f"{zone}_generation"
-                if zone_key not in zones:
-                    zones[zone_key] = 0
-                zones[zone_key] += balance
-
-        balance = sum_consumption + sum_generation
-        return balance, sum_consumption, sum_generation, zones, data_range
-
     @property
     def unique_id(self):
         """Return a unique ID."""
@@ -0,0 +1,215 @@
+"""Compact hourly series for TAURON data."""
+from __future__ import annotations
+
+import datetime
+from array import array
+from typing import Iterator, Optional
+
+
+def as_date(day: datetime.date) -> datetime.date:
+    return day.date() if isinstance(day, datetime.datetime) else day
+
+
+class HourlySeries:
+    """Hourly values of consecutive days stored in flat arrays instead of lists of per-hour dicts."""
+
+    def __init__(
+        self,
+        start: datetime.date,
+        day_lengths: bytearray | None = None,
+        values: array | None = None,
+        zones: bytearray | None = None,
+        hours: bytearray | None = None,
+        zone_keys: list[str] | None = None,
+        zone_names: dict[str, str] | None = None,
+        total: float = 0,
+        zone_totals: dict[str, float] | None = None,
+        tariff: str | None = None,
+        final: bool = True,
+        final_days: bytearray | None = None,
+    ):
+        self.start = start
+        self.day_lengths = day_lengths if day_lengths is not None else bytearray()
+        self.values = values if values is not None else array("d")
+        self.zones = zones if zones is not None else bytearray()
+        self.hours = hours if hours is not None else bytearray()
+        self.zone_keys = zone_keys if zone_keys is not None else []
+        self.zone_names = zone_names if zone_names is not None else {}
+        self.total = total
+        self.zone_totals = zone_totals if zone_totals is not None else {}
+        self.tariff = tariff
+        self.final = final
+        self.final_days = final_days if final_days is not None else bytearray([final]) * len(self.day_lengths)
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def data_range(self) -> str | None:
+        days = [i for i, length in enumerate(self.day_lengths) if length > 0]
+        if len(days) == 0:
+            return None
+        return f"{self.day(days[0]).strftime('%Y-%m-%d')} - {self.day(days[-1]).strftime('%Y-%m-%d')}"
+
+    def day(self, index: int) -> datetime.date:
+        return self.start + datetime.timedelta(days=index)
+
+    def zone_key(self, index: int) -> str:
+        return self.zone_keys[self.zones[index]]
+
+    def first_hour(self) -> tuple[datetime.date, int]:
+        for i, length in enumerate(self.day_lengths):
+            if length > 0:
+                return self.day(i), self.hours[0]
+        raise IndexError("Empty series")
+
+    def last_final_hour(self, settled_before: datetime.date | None = None) -> tuple[datetime.date, int] | None:
+        """Returns the last hour before the first day that is missing or not final yet.
+
+        Only days without data before the first day with data are skipped. Days before settled_before are taken as
+        they are, missing ones are skipped too.
+        """
+        result = None
+        index = 0
+        for day_index, length in enumerate(self.day_lengths):
+            settled = settled_before is not None and self.day(day_index) < settled_before
+            if length == 0 and (result is None or settled):
+                continue
+            if length == 0 or not (self.final_days[day_index] or settled):
+                break
+            index += length
+            result = self.day(day_index), self.hours[index - 1]
+        return result
+
+    def iter_hours(self) -> Iterator[tuple[datetime.date, int, float, str]]:
+        index = 0
+        for day_index, length in enumerate(self.day_lengths):
+            day = self.day(day_index)
+            for _ in range(length):
+                yield day, self.hours[index], self.values[index], self.zone_keys[self.zones[index]]
+                index += 1
+
+    def with_values(self, values: array, total: float, zone_totals: dict[str, float],
+                    final_days: bytearray | None = None) -> HourlySeries:
+        return HourlySeries(self.start, self.day_lengths, values, self.zones, self.hours, self.zone_keys,
+                            self.zone_names, total, zone_totals, self.tariff, self.final,
+                            final_days if final_days is not None else self.final_days)
+
+    def iter_chunks(self, days_per_chunk: int) -> Iterator[HourlySeries]:
+        """Yields chunks of consecutive days, totals are not carried over to the chunks."""
+        offset = 0
+        for first_day in range(0, len(self.day_lengths), days_per_chunk):
+            day_lengths = self.day_lengths[first_day:first_day + days_per_chunk]
+            end = offset + sum(day_lengths)
+            yield HourlySeries(self.day(first_day), day_lengths, self.values[offset:end], self.zones[offset:end],
+                               self.hours[offset:end], self.zone_keys, self.zone_names, tariff=self.tariff,
+                               final=self.final, final_days=self.final_days[first_day:first_day + days_per_chunk])
+            offset = end
+
+    @staticmethod
+    def from_json(json_data: dict, day: datetime.date) -> HourlySeries:
+        rows = json_data["data"]["allData"]
+        zone_keys = []
+        values = array("d")
+        zones = bytearray()
+        hours = bytearray()
+        for row in rows:
+            zone = str(row["Zone"])
+            if zone not in zone_keys:
+                zone_keys.append(zone)
+            values.append(float(row["EC"]) if row["EC"] is not None else 0.0)
+            zones.append(zone_keys.index(zone))
+            hours.append(int(row["Hour"]))
+        return HourlySeries(
+            start=as_date(day),
+            day_lengths=bytearray([len(rows)]),
+            values=values,
+            zones=zones,
+            hours=hours,
+            zone_keys=zone_keys,
+            zone_names=dict(json_data["data"].get("zonesName") or {}),
+            total=json_data["data"]["sum"],
+            zone_totals={str(k): v for k, v in json_data["data"]["zones"].items()},
+            tariff=json_data["data"].get("tariff"),
+            final=all(a.get("Status") is not None for a in rows),
+        )
+
+    def to_json(self) -> dict:
+        data = {
+            "allData": [
+                {"EC": str(value), "Date": day.strftime("%Y-%m-%d"), "Hour": hour, "Zone": zone}
+                for day, hour, value, zone in self.iter_hours()
+            ],
+            "sum": self.total,
+            "zones": self.zone_totals,
+            "zonesName": self.zone_names,
+        }
+        if self.tariff is not None:
+            data["tariff"] = self.tariff
+        return {"data": data}
+
+    @staticmethod
+    def from_dict(data: dict) -> HourlySeries:
+        return HourlySeries(
+            start=datetime.date.fromisoformat(data["start"]),
+            day_lengths=bytearray(data["day_lengths"]),
+            values=array("d", data["values"]),
+            zones=bytearray(data["zones"]),
+            hours=bytearray(data["hours"]),
+            zone_keys=data["zone_keys"],
+            zone_names=data["zone_names"],
+            total=data["total"],
+            zone_totals=data["zone_totals"],
+            tariff=data["tariff"],
+            final=data["final"],
+            final_days=bytearray(data["final_days"]) if "final_days" in data else None,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "start": self.start.isoformat(),
+            "day_lengths": list(self.day_lengths),
+            "values": self.values.tolist(),
+            "zones": list(self.zones),
+            "hours": list(self.hours),
+            "zone_keys": self.zone_keys,
+            "zone_names": self.zone_names,
+            "total": self.total,
+            "zone_totals": self.zone_totals,
+            "tariff": self.tariff,
+            "final": self.final,
+            "final_days": list(self.final_days),
+        }
+
+    @staticmethod
+    def concat(start: datetime.date, days: list[Optional[HourlySeries]]) -> HourlySeries | None:
+        """Joins series of consecutive days, missing days are passed as None."""
+        result = HourlySeries(start)
+        for day_series in days:
+            if day_series is None:
+                result.day_lengths.append(0)
+                result.final_days.append(0)
+                continue
+            result.extend(day_series)
+        if len(result) == 0:
+            return None
+        return result
+
+    def extend(self, other: HourlySeries):
+        translation = bytearray(range(256))
+        for i, zone in enumerate(other.zone_keys):
+            if zone not in self.zone_keys:
+                self.zone_keys.append(zone)
+            translation[i] = self.zone_keys.index(zone)
+        self.day_lengths.extend(other.day_lengths)
+        self.final_days.extend(other.final_days)
+        self.values.extend(other.values)
+        self.zones.extend(other.zones.translate(translation))
+        self.hours.extend(other.hours)
+        self.total += other.total
+        for zone, value in other.zone_totals.items():
+            self.zone_totals[zone] = self.zone_totals.get(zone, 0) + value
+        self.zone_names = other.zone_names
+        if other.tariff is not None:
+            self.tariff = other.tariff
+        self.final = self.final and other.final
@@ -10,7 +10,6 @@ from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import device_registry as dr
 
 from .const import DOMAIN
-from .statistics import TauronAmiplusStatisticsUpdater
 
 if TYPE_CHECKING:
     from homeassistant.core import HomeAssistant, ServiceCall
@@ -41,4 +40,6 @@ class DownloadStatisticsService:
         device = device_registry.async_get(call.data["device_id"])
         [config_entry_id, *_] = device.config_entries
         config_entry = self._hass.config_entries.async_get_entry(config_entry_id)
-        await TauronAmiplusStatisticsUpdater.manually_update(self._hass, start_date, config_entry)
+        coordinator = config_entry.runtime_data.coordinator
+        await coordinator.statistics_stage.async_stop()
+        await coordinator.backfill.async_start(start_date, coordinator.create_statistics_updater())
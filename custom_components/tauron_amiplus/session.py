@@ -0,0 +1,243 @@
+"""eLicznik session shared by all meters of one TAURON account."""
+import asyncio
+import contextvars
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+
+from aiohttp import ClientSession
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+
+from .const import (
+    CONST_MIN_RELOGIN_INTERVAL,
+    CONST_REQUEST_HEADERS,
+    CONST_URL_LOGIN,
+    CONST_URL_SELECT_METER,
+    CONST_URL_SERVICE,
+    DATA_SESSIONS,
+    DOMAIN,
+    STORAGE_KEY_PREFIX,
+    STORAGE_VERSION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_selected_meter: contextvars.ContextVar[tuple[int, str] | None] = contextvars.ContextVar("_selected_meter",
+                                                                                         default=None)
+
+
+class TauronAmiplusAccountSession:
+
+    def __init__(self, hass: HomeAssistant | None, username: str, password: str, persistent: bool = True):
+        self._hass = hass
+        self.username = username
+        self._password = password
+        self._storage_key = f"{STORAGE_KEY_PREFIX}_{slugify(username)}" if persistent else None
+        self.session: ClientSession | None = None
+        self.meters = []
+        self.selected_meter_id: str | None = None
+        self._tariffs: dict[str, str] = {}
+        self._valid = False
+        self._relogged_at: float | None = None
+        self._login_lock = asyncio.Lock()
+        self._meter_lock = asyncio.Lock()
+
+    @property
+    def password(self) -> str:
+        return self._password
+
+    @password.setter
+    def password(self, password: str):
+        if password != self._password:
+            self._password = password
+            self._valid = False
+
+    @asynccontextmanager
+    async def use_meter(self, meter_id: str):
+        """Selects the meter and keeps other meters of the account from switching it until the block exits."""
+        if _selected_meter.get() == (id(self), meter_id):
+            yield self._tariffs.get(meter_id, "unknown")
+            return
+        async with self._meter_lock:
+            await self.login()
+            async with self._login_lock:
+                if self.selected_meter_id != meter_id:
+                    await self.select_meter(meter_id)
+            token = _selected_meter.set((id(self), meter_id))
+            try:
+                yield self._tariffs.get(meter_id, "unknown")
+            finally:
+                _selected_meter.reset(token)
+
+    def is_valid(self) -> bool:
+        """Sessions are kept until a data request shows they expired, see relogin."""
+        return self.session is not None and self._valid
+
+    def is_business(self, meter_id: str) -> bool:
+        selected_meter_info = list(filter(lambda m: m["meter_id"] == meter_id, self.meters))
+        if len(selected_meter_info) > 0:
+            return selected_meter_info[0]["meter_type"] == "WO"
+        return False
+
+    async def login(self, restore_session: bool = True):
+        async with self._login_lock:
+            if self.is_valid():
+                self.log("Reusing logged in session")
+                return
+            session, login_response_text = await self.login_service(CONST_URL_LOGIN, CONST_URL_SERVICE,
+                                                                    restore_session)
+            self.session = session
+            self.selected_meter_id = None
+            self.log("Logged in to eLicznik.")
+            self.meters = self._get_meters(login_response_text)
+            self._valid = True
+            if not restore_session:
+                self._relogged_at = time.monotonic()
+
+    async def relogin(self, expired_session: ClientSession, meter_id: str) -> bool:
+        """Logs in again at most once per CONST_MIN_RELOGIN_INTERVAL, returns False when not worth retrying."""
+        if self.session is expired_session:
+            if (self._relogged_at is not None
+                    and time.monotonic() - self._relogged_at < CONST_MIN_RELOGIN_INTERVAL.total_seconds()):
+                self.log("Session expired again shortly after logging in, not logging in again")
+                return False
+            self.log("Session expired, logging in again")
+            self._valid = False
+        await self.login(restore_session=False)
+        async with self._login_lock:
+            if self.selected_meter_id != meter_id:
+                await self.select_meter(meter_id)
+        return True
+
+    async def select_meter(self, meter_id: str) -> str:
+        payload_select_meter = {"site[client]": meter_id}
+        self.log(f"Selecting meter: {meter_id}")
+        select_response = await self.session.request("POST", CONST_URL_SELECT_METER, data=payload_select_meter,
+                                                     headers=CONST_REQUEST_HEADERS)
+        select_response_text = await select_response.text()
+        self.selected_meter_id = meter_id
+        tariff_search = re.findall(r"[^_]Tariff: '(.*)',", select_response_text)
+        if len(tariff_search) > 0:
+            self._tariffs[meter_id] = tariff_search[0]
+        else:
+            self._tariffs[meter_id] = "unknown"
+        return self._tariffs[meter_id]
+
+    async def login_service(self, login_url: str, service: str, restore_session: bool = True) -> tuple[ClientSession, str]:
+        if restore_session:
+            success, response, session = await self.try_restore_session(service)
+            if success:
+                return session, response
+        else:
+            session = async_create_clientsession(self._hass)
+
+        self.log(f"Logging in... ({service})")
+        payload_login = {
+            "username": self.username,
+            "password": self._password,
+            "service": service,
+        }
+        r1 = await session.request(
+            "POST",
+            login_url,
+            data=payload_login,
+            headers=CONST_REQUEST_HEADERS,
+        )
+        if "Przekroczono maksymalną liczbę logowań." in await r1.text():
+            self.log("Too many login attempts")
+            raise Exception("Too many login attempts")
+        r2 = await session.request(
+            "POST",
+            login_url,
+            data=payload_login,
+            headers=CONST_REQUEST_HEADERS,
+        )
+        r2_text = await r2.text()
+        if "Przekroczono maksymalną liczbę logowań." in r2_text:
+            self.log("Too many login attempts")
+            raise Exception("Too many login attempts")
+        if "Login lub hasło są nieprawidłowe." in r2_text:
+            self.log("Invalid credentials")
+            raise ConfigEntryAuthFailed("Invalid credentials")
+        if (self.username not in r2_text) and (self.username.upper() not in r2_text):
+            self.log("Failed to login")
+            raise Exception("Failed to login")
+        await self.store_session(session, service)
+        return session, r2_text
+
+    async def try_restore_session(self, service: str) -> (bool, str | None, ClientSession):
+        session = async_create_clientsession(self._hass)
+        if self._storage_key is None or self._hass is None:
+            self.log(f"NO SESSION TO RESTORE ({service})")
+            return False, None, session
+        self.log(f"RESTORING SESSION {self._storage_key}_{slugify(service)}")
+        store = Store(self._hass, STORAGE_VERSION, f"{self._storage_key}_{slugify(service)}")
+        stored_data = await store.async_load()
+        if stored_data is None:
+            return False, None, session
+        cookies = {k: v for k, v in stored_data.get("cookies", {}).items() if k in ["PHPSESSID", "ASP.NET_SessionId"]}
+        self.log(f"COOKIES ({service}): {cookies}")
+        session.cookie_jar.clear(lambda x: True)
+        session.cookie_jar.update_cookies(cookies)
+
+        success, response = await self.validate_session(session, service)
+        self.log(f"SESSION VALID ({service}): {success}")
+
+        if success:
+            session_to_return = session
+        else:
+            self.log(f"FAILED TO RESTORE SESSION ({service})")
+            self.log(f"INVALID SESSION RESPONSE ({service})")
+            self.log(response)
+            await store.async_save({})
+            session_to_return = async_create_clientsession(self._hass)
+        return success, response, session_to_return
+
+    async def store_session(self, session: ClientSession, service: str) -> None:
+        if self._storage_key is None or self._hass is None:
+            self.log(f"SKIPPING STORING SESSION")
+            return
+        self.log(f"SAVING SESSION {self._storage_key}_{slugify(service)}")
+        store = Store(self._hass, STORAGE_VERSION, f"{self._storage_key}_{slugify(service)}")
+        cookies = {cookie.key: cookie.value for cookie in session.cookie_jar if cookie.key in ["PHPSESSID", "ASP.NET_SessionId"]}
+        self.log(f"SAVED COOKIES ({service}) {cookies}")
+        await store.async_save({"cookies": cookies})
+
+    async def validate_session(self, session: ClientSession, service: str) -> (bool, str):
+        response = await session.get(service)
+        response_text = await response.text()
+        return self.username in response_text or self.username.upper() in response_text.upper(), response_text
+
+    @staticmethod
+    def _get_meters(text: str) -> list:
+        regex = r".*data-data='{\"type\": \".*\"}'>.*"
+        matches = list(re.finditer(regex, text))
+        meters = []
+        for match in matches:
+            m1 = re.match(r".*value=\"([\d\_]+)\".*", match.group())
+            m2 = re.match(r".*\"}'>(.*)</option>", match.group())
+            m3 = re.match(r".*data-data='{\"type\": \"(.*)\"}'>.*", match.group())
+            if m1 is None or m2 is None or m3 is None:
+                continue
+            meter_id = m1.groups()[0]
+            display_name = m2.groups()[0]
+            meter_type = m3.groups()[0]
+            meters.append({"meter_id": meter_id, "meter_name": display_name, "meter_type": meter_type})
+        return meters
+
+    def log(self, msg):
+        _LOGGER.debug(f"[{self.username}]: {msg}")
+
+
+def get_account_session(hass: HomeAssistant, username: str, password: str) -> TauronAmiplusAccountSession:
+    sessions: dict[str, TauronAmiplusAccountSession] = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_SESSIONS, {})
+    if username not in sessions:
+        sessions[username] = TauronAmiplusAccountSession(hass, username, password)
+    account_session = sessions[username]
+    account_session.password = password
+    return account_session
@@ -1,17 +1,23 @@
 import datetime
 import logging
+from functools import lru_cache
 
 from homeassistant.components.recorder import get_instance
 from homeassistant.components.recorder.models import StatisticMetaData, StatisticMeanType
 from homeassistant.components.recorder.statistics import (async_add_external_statistics, get_last_statistics,
                                                           statistics_during_period)
-from homeassistant.const import CONF_PASSWORD, CONF_USERNAME, UnitOfEnergy
+from homeassistant.const import UnitOfEnergy
 from homeassistant.core import HomeAssistant
 from homeassistant.util.dt import as_utc, get_time_zone, utc_from_timestamp
 
+from .balance import calculate_balance
 from .connector import TauronAmiplusConnector, TauronAmiplusRawData
-from .const import (CONF_METER_ID, CONF_METER_NAME, CONF_SHOW_BALANCED, CONF_SHOW_GENERATION, CONST_BALANCED,
-                    CONST_CONSUMPTION, CONST_GENERATION, DEFAULT_NAME, STATISTICS_DOMAIN)
+from .const import (CONST_BALANCED, CONST_CONSUMPTION, CONST_GENERATION, CONST_HOUR_STARTS_CACHE_SIZE,
+                    CONST_MAX_LOOKUP_RANGE, CONST_STATISTICS_CHUNK_DAYS, CONST_TIME_ZONE, DEFAULT_NAME,
+                    STATISTICS_DOMAIN)
+from .executor import async_run_in_executor, log_blocking_time
+from .series import HourlySeries, as_date
+from .watermarks import TauronAmiplusStatisticsWatermarks
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,80 +25,113 @@ _LOGGER = logging.getLogger(__name__)
 class TauronAmiplusStatisticsUpdater:
 
     def __init__(self, hass: HomeAssistant, connector: TauronAmiplusConnector, meter_id: str, meter_name: str,
-                 show_generation: bool, show_balanced: bool) -> None:
+                 show_generation: bool, show_balanced: bool,
+                 watermarks: TauronAmiplusStatisticsWatermarks | None = None) -> None:
         self.hass = hass
         self.connector = connector
         self.meter_id = meter_id
         self.meter_name = meter_name
         self.show_generation = show_generation
         self.show_balanced = show_balanced
-
-    @staticmethod
-    async def manually_update(hass, start_date: datetime.date, entry) -> None:
-        username = entry.data[CONF_USERNAME]
-        password = entry.data[CONF_PASSWORD]
-        meter_id = entry.data[CONF_METER_ID]
-        meter_name = entry.data[CONF_METER_NAME]
-
-        show_generation = entry.options.get(CONF_SHOW_GENERATION, False)
-        show_balanced = entry.options.get(CONF_SHOW_BALANCED, False)
-
-        connector = TauronAmiplusConnector(username, password, meter_id, hass=hass, config_entry_id=entry.entry_id, show_generation=show_generation,
-                                           show_balanced=show_balanced)
-        statistics_updater = TauronAmiplusStatisticsUpdater(hass, connector, meter_id, meter_name, show_generation, show_balanced)
-
-        data = await connector.get_raw_data()
-        start_date = datetime.datetime.combine(start_date,
-                                               datetime.time(tzinfo=datetime.datetime.now().astimezone().tzinfo))
-        if data is not None:
-            await statistics_updater.update_all(data, start_date)
+        self.watermarks = watermarks if watermarks is not None else TauronAmiplusStatisticsWatermarks(hass, meter_id)
 
     async def update_all(self, last_data: TauronAmiplusRawData, start_date: datetime.datetime = None) -> None:
-        if last_data.consumption is None or last_data.consumption.json_last_30_days_hourly is None:
+        if last_data.consumption is None or last_data.consumption.last_30_days_hourly is None:
             return
-        raw_data = {CONST_CONSUMPTION: last_data.consumption.json_last_30_days_hourly["data"]["allData"]}
-        zones = last_data.consumption.json_last_30_days_hourly["data"]["zonesName"]
+        raw_data = {CONST_CONSUMPTION: last_data.consumption.last_30_days_hourly}
+        zones = last_data.consumption.last_30_days_hourly.zone_names
         if self.show_generation or self.show_balanced:
-            if last_data.generation is None or last_data.generation.json_last_30_days_hourly is None:
+            if last_data.generation is None or last_data.generation.last_30_days_hourly is None:
                 return
-            raw_data[CONST_GENERATION] = last_data.generation.json_last_30_days_hourly["data"]["allData"]
+            raw_data[CONST_GENERATION] = last_data.generation.last_30_days_hourly
 
         all_stat_ids = await self.prepare_stats_ids(zones)
+        await self.load_watermarks(all_stat_ids, start_date)
 
         if (start_date is not None
-                or not all([self.are_stats_up_to_date(v["last_stats_end"]) for v in all_stat_ids.values()])):
+                or not all([self.are_stats_up_to_date(v["watermark"][0] if v["watermark"] else v["last_stats_end"])
+                            for v in all_stat_ids.values()])):
             now = datetime.datetime.now()
-            if start_date is None:
+            if start_date is None and all(v["watermark"] is not None for v in all_stat_ids.values()):
+                oldest_watermark = min(v["watermark"][0] for v in all_stat_ids.values())
+                start_range = oldest_watermark.astimezone().replace(tzinfo=None, hour=0, minute=0, second=0,
+                                                                    microsecond=0)
+            elif start_date is None:
                 start_range = (now - datetime.timedelta(365)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
             else:
                 start_range = start_date.replace(tzinfo=None)
-            data_consumption = await self.connector.get_raw_values_daily_for_range(start_range, now, False)
+            data_consumption, data_generation = await self.connector.get_statistics_data(
+                start_range, now, self.show_generation or self.show_balanced)
             if data_consumption is not None:
-                raw_data[CONST_CONSUMPTION] = data_consumption["data"]["allData"]
-            if self.show_generation or self.show_balanced:
-                data_generation = await self.connector.get_raw_values_daily_for_range(start_range, now, True)
-                if data_generation is not None:
-                    raw_data[CONST_GENERATION] = data_generation["data"]["allData"]
+                raw_data[CONST_CONSUMPTION] = data_consumption
+            if data_generation is not None:
+                raw_data[CONST_GENERATION] = data_generation
 
+        await self.import_data(all_stat_ids, raw_data, start_date)
+
+    async def import_range(self, day_from: datetime.datetime, day_to: datetime.datetime, reset: bool) -> bool:
+        """Imports statistics of the given days, starting them over at day_from when reset.
+
+        Without reset sums continue from the watermarks. Statistics of a direction without data, e.g. generation before
+        a PV installation, are skipped. Returns False when there was no data to import.
+        """
+        with_generation = self.show_generation or self.show_balanced
+        data_consumption, data_generation = await self.connector.get_statistics_data(day_from, day_to, with_generation)
+        raw_data = {CONST_CONSUMPTION: data_consumption, CONST_GENERATION: data_generation}
+        if data_consumption is None and data_generation is None:
+            self.log(f"No statistics data for range: {day_from.date()} - {day_to.date()}")
+            return False
+        start_date = None
+        if reset:
+            start_date = day_from.replace(hour=0, minute=0, second=0, microsecond=0).astimezone()
+        zones = (data_consumption if data_consumption is not None else data_generation).zone_names
+        all_stat_ids = await self.prepare_stats_ids(zones)
+        await self.load_watermarks(all_stat_ids, start_date)
+        await self.import_data(all_stat_ids, raw_data, start_date)
+        return True
+
+    async def load_watermarks(self, all_stat_ids: dict[str, dict], start_date: datetime.datetime | None):
+        await self.watermarks.async_load()
+        for s, v in all_stat_ids.items():
+            v["watermark"] = self.reconcile_watermark(s, v) if start_date is None else None
+
+    async def import_data(self, all_stat_ids: dict[str, dict], raw_data: dict[str, HourlySeries | None],
+                          start_date: datetime.datetime | None):
         if self.show_balanced:
-            balanced_consumption, balanced_generation = self.prepare_balanced_raw_data(raw_data)
+            balanced_consumption, balanced_generation = await async_run_in_executor(
+                self.hass, f"[{self.meter_id}]: Balancing statistics data", self.prepare_balanced_raw_data, raw_data)
             raw_data[f"{CONST_BALANCED}_{CONST_CONSUMPTION}"] = balanced_consumption
             raw_data[f"{CONST_BALANCED}_{CONST_GENERATION}"] = balanced_generation
 
+        all_stat_ids = {s: v for s, v in all_stat_ids.items() if raw_data[v["data_source"]] is not None}
+
+        stat_ids_by_start = {}
         for s, v in all_stat_ids.items():
-            if v["last_stats_end"] is not None:
-                stat = await self.get_stats(raw_data[v["data_source"]], s)
-                v["sum"] = stat[s][0]["sum"]
-                start = stat[s][0]["start"]
-                if isinstance(start, float):
-                    start = utc_from_timestamp(start)
+            if v["watermark"] is not None:
+                v["last_stats_time"], v["sum"] = v["watermark"]
+            elif v["last_stats_end"] is not None:
+                first_hour = self.get_time(*raw_data[v["data_source"]].first_hour())
+                stat_ids_by_start.setdefault(first_hour, []).append(s)
+        stats = await self.get_stats(stat_ids_by_start)
+
+        for s, v in all_stat_ids.items():
+            if v["watermark"] is None and v["last_stats_end"] is not None:
+                if s in stats and len(stats[s]) > 0:
+                    v["sum"] = stats[s][0]["sum"]
+                    start = self.to_datetime(stats[s][0]["start"])
+                else:
+                    v["sum"] = v["last_stats_sum"]
+                    start = v["last_stats_start"]
                 if start_date is not None and start > start_date:
                     start = None
                     v["sum"] = 0
                 v["last_stats_time"] = start
 
+        stat_ids_by_source = {}
         for s, v in all_stat_ids.items():
-            await self.update_stats(s, v["name"], v["sum"], v["last_stats_time"], v["zone"], raw_data[v["data_source"]])
+            stat_ids_by_source.setdefault(v["data_source"], {})[s] = v
+        for data_source, stat_ids in stat_ids_by_source.items():
+            await self.update_stats(stat_ids, raw_data[data_source])
 
     async def prepare_stats_ids(self, zones):
         suffixes = [{
@@ -140,14 +179,30 @@ class TauronAmiplusStatisticsUpdater:
                 "data_source": s["data"],
                 "sum": 0,
                 "last_stats_time": None,
-                "last_stats_end": None
+                "last_stats_start": None,
+                "last_stats_end": None,
+                "last_stats_sum": 0,
             }
             for s in suffixes
         }
+        last_stats = await self.get_last_stats(list(all_stat_ids))
         for k, v in all_stat_ids.items():
-            v["last_stats_end"] = await self.get_last_stats_date(k)
+            if k in last_stats and len(last_stats[k]) > 0:
+                v["last_stats_start"] = self.to_datetime(last_stats[k][0]["start"])
+                v["last_stats_end"] = self.to_datetime(last_stats[k][0]["end"])
+                v["last_stats_sum"] = last_stats[k][0]["sum"]
         return all_stat_ids
 
+    def reconcile_watermark(self, statistic_id: str, stat: dict) -> tuple[datetime.datetime, float] | None:
+        watermark = self.watermarks.get(statistic_id)
+        if watermark is None:
+            return None
+        if stat["last_stats_start"] is None or stat["last_stats_start"] < watermark[0]:
+            # Recorder no longer has the rows up to the watermark, e.g. statistics were purged or restored
+            self.watermarks.remove(statistic_id)
+            return None
+        return watermark
+
     def get_stats_id(self, suffix):
         return f"{STATISTICS_DOMAIN}:{self.meter_id}_{suffix}".lower()
 
@@ -162,104 +217,128 @@ class TauronAmiplusStatisticsUpdater:
         return (as_utc(now) - last_stats_end).days < 30
 
     @staticmethod
-    def prepare_balanced_raw_data(raw_data) -> (dict, dict):
-        consumption_data = raw_data[CONST_CONSUMPTION]
-        generation_data = raw_data[CONST_GENERATION]
-        if len(consumption_data) != len(generation_data):
-            return {}, {}
-        balanced_consumption = []
-        balanced_generation = []
-
-        for consumption, generation in zip(consumption_data, generation_data):
-            value_consumption = float(consumption["EC"])
-            value_generation = float(generation["EC"])
-            balance = value_consumption - value_generation
-            if balance > 0:
-                output_consumption = {
-                    "EC": f'{balance}',
-                    "Date": consumption["Date"],
-                    "Hour": consumption["Hour"],
-                    "Zone": consumption["Zone"],
-                }
-                output_generation = {
-                    "EC": "0",
-                    "Date": generation["Date"],
-                    "Hour": generation["Hour"],
-                    "Zone": generation["Zone"],
-                }
-            else:
-                output_consumption = {
-                    "EC": "0",
-                    "Date": consumption["Date"],
-                    "Hour": consumption["Hour"],
-                    "Zone": consumption["Zone"],
-                }
-                output_generation = {
-                    "EC": f'{-balance}',
-                    "Date": generation["Date"],
-                    "Hour": generation["Hour"],
-                    "Zone": generation["Zone"],
-                }
-            balanced_consumption.append(output_consumption)
-            balanced_generation.append(output_generation)
-
-        return balanced_consumption, balanced_generation
-
-    async def update_stats(self, statistic_id, statistic_name, initial_sum, last_stats_time, zone_id, raw_data):
-        current_sum = initial_sum
-        metadata: StatisticMetaData = {
-            "has_mean": False,
-            "has_sum": True,
-            "name": statistic_name,
-            "source": STATISTICS_DOMAIN,
-            "statistic_id": statistic_id,
-            "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
-            "mean_type": StatisticMeanType.NONE,
-            "unit_class": "energy",
+    def settled_before() -> datetime.date:
+        """Returns the first day eLicznik may still fill in, older missing or provisional days are not waited for."""
+        return datetime.date.today() - datetime.timedelta(days=CONST_MAX_LOOKUP_RANGE)
+
+    @staticmethod
+    def prepare_balanced_raw_data(raw_data) -> (HourlySeries | None, HourlySeries | None):
+        consumption_data: HourlySeries = raw_data[CONST_CONSUMPTION]
+        generation_data: HourlySeries = raw_data[CONST_GENERATION]
+        if consumption_data is None or generation_data is None or len(consumption_data) != len(generation_data):
+            return None, None
+        balance = calculate_balance(consumption_data, generation_data)
+        # Balanced rows depend on both directions, so a day is final only when it is final in both
+        final_days = bytearray(c and g for c, g in zip(consumption_data.final_days, generation_data.final_days))
+        return (consumption_data.with_values(balance.consumption, balance.sum_consumption, balance.zones_consumption,
+                                             final_days),
+                generation_data.with_values(balance.generation, balance.sum_generation, balance.zones_generation,
+                                            final_days))
+
+    async def update_stats(self, stat_ids: dict[str, dict], raw_data: HourlySeries):
+        """Imports the total and zone statistics fed by one series in a single pass over its hours."""
+        metadata: dict[str, StatisticMetaData] = {
+            statistic_id: {
+                "has_mean": False,
+                "has_sum": True,
+                "name": v["name"],
+                "source": STATISTICS_DOMAIN,
+                "statistic_id": statistic_id,
+                "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
+                "mean_type": StatisticMeanType.NONE,
+                "unit_class": "energy",
+            }
+            for statistic_id, v in stat_ids.items()
         }
-        statistic_data = []
-        for raw_hour in raw_data:
-            start = self.get_time(raw_hour)
-            if last_stats_time is not None and start <= last_stats_time:
+        targets = [(statistic_id, v["zone"], v["last_stats_time"]) for statistic_id, v in stat_ids.items()]
+        sums = {statistic_id: v["sum"] for statistic_id, v in stat_ids.items()}
+        last_final_hour = raw_data.last_final_hour(self.settled_before())
+        final_start = self.get_time(*last_final_hour) if last_final_hour is not None else None
+        final_rows = {}
+        rows_count = dict.fromkeys(stat_ids, 0)
+        for chunk in raw_data.iter_chunks(CONST_STATISTICS_CHUNK_DAYS):
+            statistic_data, sums, chunk_final_rows = await async_run_in_executor(
+                self.hass, f"[{self.meter_id}]: Building rows for {len(targets)} statistics from {len(chunk)} hours",
+                self.build_statistic_rows, chunk, targets, sums, final_start)
+            final_rows.update(chunk_final_rows)
+            statistic_data = {s: rows for s, rows in statistic_data.items() if len(rows) > 0}
+            if len(statistic_data) == 0:
                 continue
-            usage = float(raw_hour["EC"])
-            if zone_id is not None and raw_hour["Zone"] != zone_id:
-                usage = 0
-            current_sum += usage
-            stats = {
-                "start": start,
-                "state": usage,
-                "sum": current_sum
-            }
-            statistic_data.append(stats)
-        async_add_external_statistics(self.hass, metadata, statistic_data)
-        self.log(f"Updated {len(statistic_data)} entries for statistic: {statistic_id} ")
-
-    async def get_last_stats_date(self, statistic_id):
-        last_stats = await self.get_last_stats(statistic_id)
-        if statistic_id in last_stats and len(last_stats[statistic_id]) > 0:
-            end = last_stats[statistic_id][0]["end"]
-            if isinstance(end, float):
-                end = utc_from_timestamp(end)
-            return end
-        return None
-
-    async def get_last_stats(self, statistic_id):
+            with log_blocking_time(f"[{self.meter_id}]: Adding rows for {len(statistic_data)} statistics"):
+                for statistic_id, rows in statistic_data.items():
+                    async_add_external_statistics(self.hass, metadata[statistic_id], rows)
+                    rows_count[statistic_id] += len(rows)
+            await get_instance(self.hass).async_block_till_done()
+        for statistic_id, count in rows_count.items():
+            self.log(f"Updated {count} entries for statistic: {statistic_id} ")
+        for statistic_id, (start, current_sum) in final_rows.items():
+            self.watermarks.set(statistic_id, start, current_sum)
+
+    @staticmethod
+    def build_statistic_rows(raw_data: HourlySeries, targets: list[tuple[str, str | None, datetime.datetime | None]],
+                             initial_sums: dict[str, float], final_start: datetime.datetime | None
+                             ) -> (dict[str, list[dict]], dict[str, float], dict[str, tuple[datetime.datetime, float]]):
+        """Builds rows of all targets, also returns the start and sum of the last row of final data of each target."""
+        sums = dict(initial_sums)
+        statistic_data = {statistic_id: [] for statistic_id, _, _ in targets}
+        final_rows = {}
+        for date, hour, usage, zone in raw_data.iter_hours():
+            start = TauronAmiplusStatisticsUpdater.get_time(date, hour)
+            for statistic_id, zone_id, last_stats_time in targets:
+                if last_stats_time is not None and start <= last_stats_time:
+                    continue
+                value = usage if zone_id is None or zone == zone_id else 0
+                sums[statistic_id] += value
+                statistic_data[statistic_id].append({
+                    "start": start,
+                    "state": value,
+                    "sum": sums[statistic_id]
+                })
+                if final_start is not None and start <= final_start:
+                    final_rows[statistic_id] = (start, sums[statistic_id])
+        return statistic_data, sums, final_rows
+
+    async def get_last_stats(self, statistic_ids: list[str]) -> dict[str, list]:
         return await get_instance(self.hass).async_add_executor_job(
-            get_last_statistics,
-            self.hass, 1, statistic_id, True, {"state", "sum"})
+            self.get_last_statistics_batch, self.hass, statistic_ids)
 
-    async def get_stats(self, raw_data, statistic_id):
+    @staticmethod
+    def get_last_statistics_batch(hass: HomeAssistant, statistic_ids: list[str]) -> dict[str, list]:
+        last_stats = {}
+        for statistic_id in statistic_ids:
+            last_stats.update(get_last_statistics(hass, 1, statistic_id, True, {"state", "sum"}))
+        return last_stats
+
+    async def get_stats(self, stat_ids_by_start: dict[datetime.datetime, list[str]]) -> dict[str, list]:
+        if len(stat_ids_by_start) == 0:
+            return {}
         return await get_instance(self.hass).async_add_executor_job(
-            statistics_during_period,
-            self.hass, self.get_time(raw_data[0]), None, [statistic_id], "hour", None, {"state", "sum"})
+            self.get_statistics_batch, self.hass, stat_ids_by_start)
+
+    @staticmethod
+    def get_statistics_batch(hass: HomeAssistant, stat_ids_by_start: dict[datetime.datetime, list[str]]) -> dict[str, list]:
+        stats = {}
+        for start, statistic_ids in stat_ids_by_start.items():
+            stats.update(statistics_during_period(hass, start, None, set(statistic_ids), "hour", None,
+                                                  {"state", "sum"}))
+        return stats
+
+    @staticmethod
+    def to_datetime(value: datetime.datetime | float) -> datetime.datetime:
+        if isinstance(value, float):
+            return utc_from_timestamp(value)
+        return value
 
     def log(self, msg):
         _LOGGER.debug(f"[{self.meter_id}]: {msg}")
 
     @staticmethod
-    def get_time(raw_hour):
-        zone = get_time_zone("Europe/Warsaw")
-        date = raw_hour["Date"]
-        hour = int(raw_hour["Hour"]) - 1
-        return datetime.datetime.strptime(f"{date} {hour}:00", "%Y-%m-%d %H:%M").replace(tzinfo=zone)
+    def get_time(date: datetime.date, hour: int):
+        return get_hour_starts(as_date(date))[hour - 1]
+
+
+@lru_cache(maxsize=CONST_HOUR_STARTS_CACHE_SIZE)
+def get_hour_starts(day: datetime.date) -> tuple[datetime.datetime, ...]:
+    """Returns start times of hours 1-25 of the day, counted from local midnight so 23 and 25-hour days line up."""
+    midnight = as_utc(datetime.datetime.combine(day, datetime.time(), tzinfo=get_time_zone(CONST_TIME_ZONE)))
+    return tuple(midnight + datetime.timedelta(hours=hour) for hour in range(25))
@@ -0,0 +1,139 @@
+"""Shared hourly timeline for TAURON data sets."""
+import datetime
+from enum import Enum
+
+from .series import HourlySeries
+
+
+class DayState(Enum):
+    MISSING = "missing"
+    PROVISIONAL = "provisional"
+    FINAL = "final"
+
+
+class HourlyTimeline:
+    """Merged hourly data of consecutive days with prefix sums used to slice overlapping windows."""
+
+    def __init__(self):
+        self.first_day: datetime.date | None = None
+        self._days_data = []
+        self._days_state = []
+        self._series: HourlySeries | None = None
+        self._day_offsets = [0]
+        self._sum_prefix = [0]
+        self._zones_prefix: dict[str, list] = {}
+
+    @staticmethod
+    def get_day_state(day_data: HourlySeries | None) -> DayState:
+        if day_data is None:
+            return DayState.MISSING
+        if day_data.final:
+            return DayState.FINAL
+        return DayState.PROVISIONAL
+
+    @property
+    def last_day(self) -> datetime.date:
+        return self.first_day + datetime.timedelta(days=len(self._days_data) - 1)
+
+    def set_range(self, first_day: datetime.date, last_day: datetime.date):
+        days_count = (last_day - first_day).days + 1
+        days_data = [None] * days_count
+        days_state = [DayState.MISSING] * days_count
+        if self.first_day is not None:
+            for i, (day_data, day_state) in enumerate(zip(self._days_data, self._days_state)):
+                index = (self.first_day - first_day).days + i
+                if 0 <= index < days_count:
+                    days_data[index] = day_data
+                    days_state[index] = day_state
+        self.first_day = first_day
+        self._days_data = days_data
+        self._days_state = days_state
+
+    def days_to_refresh(self) -> list[datetime.date]:
+        return [
+            self.first_day + datetime.timedelta(days=i)
+            for i, state in enumerate(self._days_state)
+            if state != DayState.FINAL
+        ]
+
+    def set_day(self, day: datetime.date, day_data: HourlySeries | None):
+        index = (day - self.first_day).days
+        self._days_data[index] = day_data
+        self._days_state[index] = HourlyTimeline.get_day_state(day_data)
+
+    def has_gaps(self, day_from: datetime.date, day_to: datetime.date) -> bool:
+        """Checks if any day of the range is missing, not counting trailing days that are not published yet."""
+        if self.first_day is None or day_from < self.first_day or day_to > self.last_day:
+            return True
+        start = (day_from - self.first_day).days
+        end = (day_to - self.first_day).days + 1
+        states = self._days_state[start:end]
+        while len(states) > 0 and states[-1] == DayState.MISSING:
+            states.pop()
+        return len(states) == 0 or DayState.MISSING in states
+
+    def latest_day_with_data(self, day_from: datetime.date, day_to: datetime.date) -> datetime.date | None:
+        for index in range(self._index(day_to), self._index(day_from) - 1, -1):
+            if index < len(self._days_data) and self._days_data[index] is not None and len(self._days_data[index]) > 0:
+                return self.first_day + datetime.timedelta(days=index)
+        return None
+
+    def rebuild(self):
+        self._series = HourlySeries.concat(self.first_day, self._days_data) or HourlySeries(self.first_day)
+        self._day_offsets = [0]
+        self._sum_prefix = [0]
+        self._zones_prefix = {}
+        for day_data in self._days_data:
+            if day_data is not None:
+                for z in day_data.zone_totals:
+                    self._zones_prefix.setdefault(z, [0])
+
+        for day_data in self._days_data:
+            day_sum = 0
+            day_zones = {}
+            day_length = 0
+            if day_data is not None:
+                day_sum = day_data.total
+                day_zones = day_data.zone_totals
+                day_length = len(day_data)
+            self._day_offsets.append(self._day_offsets[-1] + day_length)
+            self._sum_prefix.append(self._sum_prefix[-1] + day_sum)
+            for z, prefix in self._zones_prefix.items():
+                prefix.append(prefix[-1] + day_zones.get(z, 0))
+
+    def _index(self, day: datetime.date) -> int:
+        return min(max((day - self.first_day).days, 0), len(self._days_data))
+
+    def slice(self, day_from: datetime.date, day_to: datetime.date) -> HourlySeries | None:
+        start = self._index(day_from)
+        end = self._index(day_to + datetime.timedelta(days=1))
+        offset_start = self._day_offsets[start]
+        offset_end = self._day_offsets[end]
+        if offset_start == offset_end:
+            return None
+        days = self._days_data[start:end]
+        result = HourlySeries(
+            start=self.first_day + datetime.timedelta(days=start),
+            day_lengths=self._series.day_lengths[start:end],
+            values=self._series.values[offset_start:offset_end],
+            zones=self._series.zones[offset_start:offset_end],
+            hours=self._series.hours[offset_start:offset_end],
+            zone_keys=self._series.zone_keys,
+            total=self._sum_prefix[end] - self._sum_prefix[start],
+            zone_totals={
+                z: prefix[end] - prefix[start]
+                for z, prefix in self._zones_prefix.items()
+                if any(d is not None and z in d.zone_totals for d in days)
+            },
+            final=all(d is None or d.final for d in days),
+            final_days=self._series.final_days[start:end],
+        )
+        for day_data in reversed(days):
+            if day_data is None:
+                continue
+            if len(result.zone_names) == 0:
+                result.zone_names = day_data.zone_names
+            if day_data.tariff is not None:
+                result.tariff = day_data.tariff
+                break
+        return result
@@ -0,0 +1,55 @@
+"""Persisted progress of the statistics import."""
+import datetime
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import WATERMARKS_SAVE_DELAY, WATERMARKS_STORAGE_KEY_PREFIX, WATERMARKS_STORAGE_VERSION
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TauronAmiplusStatisticsWatermarks:
+    """Last imported final hour and the running sum at that hour for each statistic of a meter."""
+
+    def __init__(self, hass: HomeAssistant, meter_id: str):
+        self._meter_id = meter_id
+        self._store = Store(hass, WATERMARKS_STORAGE_VERSION, f"{WATERMARKS_STORAGE_KEY_PREFIX}_{meter_id}")
+        self._loaded = False
+        self._watermarks: dict[str, tuple[datetime.datetime, float]] = {}
+
+    async def async_load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        stored_data = await self._store.async_load()
+        if stored_data is None:
+            return
+        self._watermarks = {
+            statistic_id: (datetime.datetime.fromisoformat(v["start"]), v["sum"])
+            for statistic_id, v in stored_data.get("watermarks", {}).items()
+        }
+
+    def get(self, statistic_id: str) -> tuple[datetime.datetime, float] | None:
+        return self._watermarks.get(statistic_id)
+
+    def set(self, statistic_id: str, start: datetime.datetime, current_sum: float):
+        self._watermarks[statistic_id] = (start, current_sum)
+        self._store.async_delay_save(self._data_to_save, WATERMARKS_SAVE_DELAY)
+
+    def remove(self, statistic_id: str):
+        if self._watermarks.pop(statistic_id, None) is not None:
+            self.log(f"Dropped watermark of statistic: {statistic_id}")
+            self._store.async_delay_save(self._data_to_save, WATERMARKS_SAVE_DELAY)
+
+    def _data_to_save(self) -> dict:
+        return {
+            "watermarks": {
+                statistic_id: {"start": start.isoformat(), "sum": current_sum}
+                for statistic_id, (start, current_sum) in self._watermarks.items()
+            }
+        }
+
+    def log(self, msg):
+        _LOGGER.debug(f"[{self._meter_id}]: {msg}")